@@ -0,0 +1 @@
+# Módulos de apoio ao painel de operações do SIL da Log-In
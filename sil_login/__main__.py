@@ -0,0 +1,79 @@
+import argparse
+import json
+import os
+import sys
+
+import pandas as pd
+
+from sil_login.configuracao import PASTA_SNAPSHOT, origem_arquivos
+from sil_login.metricas import calcular_todos, carregar
+
+# Resultados tabulares gravados em um CSV cada, com as colunas do filtro
+TABELAS = ['tipos_operacao', 'pontualidade', 'faturamento_por_mes', 'faturamento_por_filial', 'atrasos_por_filial']
+
+
+def _tabela(valor):
+    if isinstance(valor, pd.Series):
+        return valor.rename('Quantidade').reset_index()
+    return valor
+
+
+def gravar_json(resultados, destino):
+    registros = []
+    for resultado in resultados:
+        registro = {'filtro': resultado['filtro'], 'indicadores': resultado['indicadores']}
+        for nome in TABELAS:
+            if nome in resultado:
+                registro[nome] = json.loads(_tabela(resultado[nome]).to_json(orient='records', force_ascii=False))
+        registros.append(registro)
+    with open(os.path.join(destino, 'relatorio.json'), 'w', encoding='utf-8') as arquivo:
+        json.dump(registros, arquivo, ensure_ascii=False, indent=1)
+
+
+def gravar_csv(resultados, destino):
+    linhas_indicadores = []
+    tabelas = {nome: [] for nome in TABELAS}
+    for resultado in resultados:
+        filtro = {f'filtro_{chave}': valor for chave, valor in resultado['filtro'].items()}
+        linhas_indicadores.append({**filtro, **resultado['indicadores']})
+        for nome in TABELAS:
+            if nome in resultado:
+                tabelas[nome].append(_tabela(resultado[nome]).assign(**filtro))
+
+    pd.DataFrame(linhas_indicadores).to_csv(os.path.join(destino, 'indicadores.csv'), sep=';', index=False)
+    for nome, partes in tabelas.items():
+        if partes:
+            pd.concat(partes, ignore_index=True).to_csv(os.path.join(destino, f'{nome}.csv'), sep=';', index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m sil_login',
+        description='Calcula os indicadores do painel para todas as combinações de filtro.',
+    )
+    parser.add_argument('--arquivos', default=origem_arquivos(),
+                        help="padrão dos CSVs exportados, ex.: 'SIL Log-In/*.csv' (padrão: SIL_ARQUIVOS ou SIL_CACHE)")
+    parser.add_argument('--snapshot', default=PASTA_SNAPSHOT, help='pasta do snapshot Parquet (padrão: SIL_SNAPSHOT)')
+    parser.add_argument('--saida', required=True, help='pasta onde os relatórios serão gravados')
+    parser.add_argument('--formato', choices=['json', 'csv'], default='json')
+    args = parser.parse_args(argv)
+
+    cubo, _, erros = carregar(args.arquivos, args.snapshot)
+    for caminho, erro in erros:
+        print(f'Erro ao ler o arquivo {caminho}: {erro}', file=sys.stderr)
+    if cubo is None:
+        print('Nenhum dado foi carregado dos arquivos CSV.', file=sys.stderr)
+        return 1
+
+    os.makedirs(args.saida, exist_ok=True)
+    resultados = list(calcular_todos(cubo))
+    if args.formato == 'json':
+        gravar_json(resultados, args.saida)
+    else:
+        gravar_csv(resultados, args.saida)
+    print(f'{len(resultados)} combinações gravadas em {args.saida}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,66 @@
+import pandas as pd
+
+from sil_login.configuracao import nome_meses
+from sil_login.cubo import COM_NUMERO
+
+
+def anos_disponiveis(cubo):
+    # Anos presentes no cubo, em ordem crescente
+    return sorted(int(ano) for ano in cubo['Ano'].unique())
+
+
+# Calcula, em uma única passada agrupada, o faturamento e o faturamento
+# cancelado de cada (Ano, Mês, Filial) presente em uma fatia do cubo
+def faturamento_mensal_por_filial(fatia):
+    canceladas = fatia['Situação programação'] == 'CANCELADA'
+    base = pd.DataFrame({
+        'Ano': fatia['Ano'],
+        'Mês': fatia['Mês'],
+        'Filial': fatia['Filial'],
+        'Faturamento Atendido': fatia['Faturamento'],
+        'Faturamento Cancelado': fatia['Faturamento'].where(canceladas, 0),
+    })
+    return base.groupby(['Ano', 'Mês', 'Filial'], dropna=False, observed=True).sum().reset_index()
+
+
+# Soma as filiais e completa os 12 meses de cada ano em `anos` com zero,
+# no formato usado pelos gráficos de faturamento por mês
+def faturamento_por_mes(faturamento_mensal, anos):
+    grade = pd.MultiIndex.from_product([anos, range(1, 13)], names=['Ano', 'Mês'])
+    df_faturamento_por_mes = (
+        faturamento_mensal
+        .groupby(['Ano', 'Mês'])[['Faturamento Atendido', 'Faturamento Cancelado']].sum()
+        .reindex(grade, fill_value=0)
+        .reset_index()
+    )
+    df_faturamento_por_mes['Nome Mês'] = [nome_meses[mes - 1] for mes in df_faturamento_por_mes['Mês']]
+    return df_faturamento_por_mes
+
+
+def nao_canceladas(fatia):
+    # Células com número de programação e situação diferente de 'CANCELADA'
+    validas = fatia[fatia[COM_NUMERO]]
+    return validas[validas['Situação programação'] != 'CANCELADA']
+
+
+def tipos_operacao(fatia):
+    # Quantidade de programações não canceladas por tipo de operação
+    return nao_canceladas(fatia).groupby('Tipo de programação', dropna=False, sort=False, observed=True)['Linhas'].sum().reset_index()
+
+
+def pontualidade(fatia):
+    # Quantidade de programações não canceladas por situação do prazo
+    return nao_canceladas(fatia).groupby('Situação prazo programação', dropna=False, sort=False, observed=True)['Linhas'].sum().reset_index()
+
+
+def faturamento_por_filial(fatia):
+    # Faturamento atendido de cada filial e a sua porcentagem no período
+    df_faturamento_por_filial = fatia.groupby('Filial', observed=True)['Faturamento'].sum().reset_index(name='Faturamento Atendido')
+    faturamento_total_periodo = df_faturamento_por_filial['Faturamento Atendido'].sum()
+    df_faturamento_por_filial['Porcentagem'] = df_faturamento_por_filial['Faturamento Atendido'] / faturamento_total_periodo * 100
+    return df_faturamento_por_filial
+
+
+def atrasos_por_filial(fatia):
+    # Quantidade de programações atrasadas por filial
+    return fatia[fatia['Situação prazo programação'] == 'Atrasado'].groupby('Filial', observed=True)['Linhas'].sum()
@@ -0,0 +1,64 @@
+import contextlib
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+# Locks deste processo por arquivo de trava
+_travas = {}
+_travas_lock = threading.Lock()
+
+
+def substituir(destino, gravar):
+    # Gravar com `gravar(caminho)` em um temporário de nome único na pasta do
+    # destino e renomear, para nunca deixar o arquivo pela metade nem dividir
+    # o temporário com outra gravação
+    descritor, temporario = tempfile.mkstemp(
+        prefix=os.path.basename(destino) + '.', suffix='.tmp', dir=os.path.dirname(destino),
+    )
+    os.close(descritor)
+    try:
+        gravar(temporario)
+        os.replace(temporario, destino)
+    except BaseException:
+        try:
+            os.remove(temporario)
+        except OSError:
+            pass
+        raise
+
+
+# Trava exclusiva pelo arquivo `caminho_trava`, entre threads e entre
+# processos (vários processos do painel e as linhas de comando podem usar as
+# mesmas pastas). Espera até a trava ser liberada.
+@contextlib.contextmanager
+def travar(caminho_trava):
+    with _travas_lock:
+        trava = _travas.setdefault(os.path.abspath(caminho_trava), threading.Lock())
+    with trava, open(caminho_trava, 'a+b') as arquivo:
+        if fcntl is not None:
+            fcntl.flock(arquivo, fcntl.LOCK_EX)
+        else:
+            while True:
+                # LK_LOCK desiste depois de uns 10 segundos; tentar de novo
+                try:
+                    arquivo.seek(0)
+                    msvcrt.locking(arquivo.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(arquivo, fcntl.LOCK_UN)
+            else:
+                arquivo.seek(0)
+                msvcrt.locking(arquivo.fileno(), msvcrt.LK_UNLCK, 1)
@@ -0,0 +1,209 @@
+import argparse
+import concurrent.futures
+import datetime
+import functools
+import glob
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:
+    # Windows
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+from sil_login import cubo, snapshot
+from sil_login.agregacoes import anos_disponiveis, faturamento_mensal_por_filial, faturamento_por_mes
+from sil_login.carregamento import ler_csv
+from sil_login.configuracao import COLUNA_DATA, FORMATO_DATA
+from sil_login.graficos import montar_graficos
+from sil_login.instrumentacao import memoria_processo_mb
+from sil_login.metricas import calcular, filiais_disponiveis, regioes_disponiveis
+from sil_login.sintetico import gerar_exportacoes
+from sil_login.tratamento import COLUNAS_PAINEL, tratar_dados
+
+ARQUIVO_RESULTADOS = os.path.join('benchmarks', 'resultados.jsonl')
+
+
+# Executa uma etapa medindo o tempo ou, com `memoria`, o pico de memória
+# alocada por ela. O tracemalloc deixa as etapas muito mais lentas, por isso
+# tempo e memória são medidos em execuções separadas.
+def medir(etapas, memoria, nome, funcao, *args):
+    if memoria:
+        tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = funcao(*args)
+    segundos = time.perf_counter() - inicio
+    if memoria:
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        etapas[nome] = {'pico_mb': round(pico / 1024 ** 2, 2)}
+    else:
+        etapas[nome] = {'segundos': round(segundos, 4)}
+    return resultado
+
+
+def rss_maximo_mb():
+    # Pico de memória residente do processo. Sem `resource` (Windows), o pico
+    # do conjunto de trabalho pelo psutil ou, na falta dele, a memória atual.
+    if resource is not None:
+        maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Em KB no Linux e em bytes no macOS
+        return round(maximo / (1024 ** 2 if sys.platform == 'darwin' else 1024), 1)
+    if psutil is not None and hasattr(psutil.Process().memory_info(), 'peak_wset'):
+        return round(psutil.Process().memory_info().peak_wset / 1024 ** 2, 1)
+    memoria = memoria_processo_mb()
+    return None if memoria is None else round(memoria, 1)
+
+
+def combinacoes(cubo_montado):
+    # Mesmas combinações de região, filial e período oferecidas no painel
+    anos = anos_disponiveis(cubo_montado)
+    periodos = [('Todos', None)] + [(ano, None) for ano in anos] + [(ano, mes) for ano in anos for mes in range(1, 13)]
+    for regiao in ['Todos'] + regioes_disponiveis(cubo_montado):
+        for filial in ['Todos'] + [f for f in filiais_disponiveis(cubo_montado, regiao) if pd.notna(f)]:
+            for ano, mes in periodos:
+                yield regiao, filial, ano, mes
+
+
+def ler_csvs(padrao):
+    # Leitura dos CSVs mensais em paralelo, como na conversão para o snapshot
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        meses = [df for _, df in executor.map(ler_csv, sorted(glob.glob(padrao)))]
+    return pd.concat(meses, ignore_index=True)
+
+
+# Executa todas as etapas do painel, do CSV às figuras, sobre os arquivos que
+# casam com `padrao`. Os caches são limpos antes, para medir a carga a frio.
+def executar(padrao, pasta_snapshot, memoria=False):
+    for modulo in (snapshot, cubo):
+        modulo.limpar_cache()
+    etapas = {}
+
+    data = medir(etapas, memoria, 'ingestao', ler_csvs, padrao)
+    converter_datas = functools.partial(pd.to_datetime, format=FORMATO_DATA, errors='coerce')
+    medir(etapas, memoria, 'conversao_datas', converter_datas, data[COLUNA_DATA])
+    medir(etapas, memoria, 'tratamento', tratar_dados, data)
+    linhas = len(data)
+    del data
+
+    medir(etapas, memoria, 'snapshot', snapshot.atualizar_snapshot, padrao, pasta_snapshot)
+    particoes = medir(etapas, memoria, 'leitura_snapshot', snapshot.ler_particoes, pasta_snapshot, COLUNAS_PAINEL)
+    cubo_montado = medir(etapas, memoria, 'cubo', cubo.atualizar_cubo, particoes)
+
+    filtros = list(combinacoes(cubo_montado))
+    fatias = medir(etapas, memoria, 'filtragem_cubo', lambda: [cubo.fatiar(cubo_montado, *filtro) for filtro in filtros])
+    medir(etapas, memoria, 'indicadores', lambda: [cubo.indicadores(fatia, filtro[1]) for fatia, filtro in zip(fatias, filtros)])
+
+    anos = anos_disponiveis(cubo_montado)
+    regioes_filiais = sorted({filtro[:2] for filtro in filtros}, key=str)
+    medir(etapas, memoria, 'faturamento_mensal', lambda: [
+        faturamento_por_mes(faturamento_mensal_por_filial(cubo.fatiar(cubo_montado, regiao, filial)), anos)
+        for regiao, filial in regioes_filiais
+    ])
+
+    # Figuras do filtro por ano para cada região e filial
+    resultados = [calcular(cubo_montado, regiao, filial) for regiao, filial in regioes_filiais]
+    medir(etapas, memoria, 'graficos', lambda: [montar_graficos(resultado) for resultado in resultados])
+
+    return {
+        'linhas': linhas,
+        'combinacoes': len(filtros),
+        'etapas': etapas,
+        'rss_max_mb': rss_maximo_mb(),
+    }
+
+
+def versao_codigo():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def resultado_anterior(arquivo_resultados, linhas):
+    # Último resultado gravado para o mesmo tamanho de dados
+    anterior = None
+    if os.path.exists(arquivo_resultados):
+        with open(arquivo_resultados, encoding='utf-8') as arquivo:
+            for linha in arquivo:
+                registro = json.loads(linha)
+                if registro['linhas'] == linhas:
+                    anterior = registro
+    return anterior
+
+
+def imprimir(registro, anterior):
+    print(f"\n{registro['linhas']:,} linhas, {registro['combinacoes']} combinações de filtro")
+    print(f"{'etapa':<20}{'segundos':>10}{'pico MB':>10}{'anterior':>10}{'variação':>10}")
+    for nome, medida in registro['etapas'].items():
+        pico = f"{medida['pico_mb']:>10.1f}" if 'pico_mb' in medida else f"{'-':>10}"
+        linha = f"{nome:<20}{medida['segundos']:>10.3f}{pico}"
+        if anterior and nome in anterior['etapas'] and anterior['etapas'][nome]['segundos']:
+            segundos_antes = anterior['etapas'][nome]['segundos']
+            linha += f"{segundos_antes:>10.3f}{(medida['segundos'] / segundos_antes - 1) * 100:>+9.0f}%"
+        print(linha)
+    if registro['rss_max_mb'] is not None:
+        print(f"RSS máximo do processo: {registro['rss_max_mb']:,.1f} MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m sil_login.benchmark',
+        description='Mede o tempo e a memória de cada etapa do painel com dados sintéticos.',
+    )
+    parser.add_argument('--linhas', type=int, nargs='+', default=[100_000],
+                        help='tamanhos a medir (ex.: 100000 1000000 10000000)')
+    parser.add_argument('--dados', help='pasta onde os dados sintéticos são guardados e reaproveitados entre execuções')
+    parser.add_argument('--resultados', default=ARQUIVO_RESULTADOS, help='arquivo JSON Lines onde os resultados são acumulados')
+    parser.add_argument('--sem-memoria', action='store_true', help='não repetir as etapas para medir o pico de memória')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as temporaria:
+        pasta_dados = args.dados or temporaria
+        for linhas in args.linhas:
+            pasta_csv = os.path.join(pasta_dados, f'{linhas}')
+            if not os.path.isdir(pasta_csv):
+                print(f'Gerando {linhas:,} linhas em {pasta_csv}...')
+                gerar_exportacoes(pasta_csv, linhas)
+
+            padrao = os.path.join(pasta_csv, '*.csv')
+            with tempfile.TemporaryDirectory() as pasta_snapshot:
+                registro = executar(padrao, pasta_snapshot)
+            if not args.sem_memoria:
+                with tempfile.TemporaryDirectory() as pasta_snapshot:
+                    memoria = executar(padrao, pasta_snapshot, memoria=True)
+                for nome, medida in memoria['etapas'].items():
+                    registro['etapas'][nome].update(medida)
+                registro['rss_max_mb'] = memoria['rss_max_mb']
+            registro.update({
+                'data': datetime.datetime.now().isoformat(timespec='seconds'),
+                'versao': versao_codigo(),
+                'python': sys.version.split()[0],
+                'pandas': pd.__version__,
+            })
+
+            imprimir(registro, resultado_anterior(args.resultados, linhas))
+            os.makedirs(os.path.dirname(args.resultados) or '.', exist_ok=True)
+            with open(args.resultados, 'a', encoding='utf-8') as arquivo:
+                arquivo.write(json.dumps(registro, ensure_ascii=False) + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
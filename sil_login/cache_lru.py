@@ -0,0 +1,80 @@
+import collections
+import sys
+import threading
+
+import pandas as pd
+
+
+def tamanho_bytes(valor):
+    # Tamanho aproximado de um resultado: DataFrames e Series pela memória
+    # ocupada, dicionários e listas pela soma dos itens
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(deep=True).sum())
+    if isinstance(valor, pd.Series):
+        return int(valor.memory_usage(deep=True))
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(tamanho_bytes(item) for item in valor.values())
+    if isinstance(valor, (list, tuple)):
+        return sys.getsizeof(valor) + sum(tamanho_bytes(item) for item in valor)
+    return sys.getsizeof(valor)
+
+
+# Cache LRU limitado pelo número de itens e pelo total de bytes, com
+# contadores de acertos e falhas. Cada valor pertence a uma versão dos dados;
+# ao pedir um valor de outra versão o cache é esvaziado, já que nada do que
+# estava nele vale mais.
+class CacheLRU:
+    def __init__(self, maximo_itens, maximo_bytes, tamanho=tamanho_bytes):
+        self.maximo_itens = maximo_itens
+        self.maximo_bytes = maximo_bytes
+        self.tamanho = tamanho
+        self._itens = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.versao = None
+        self.bytes = 0
+        self.acertos = 0
+        self.falhas = 0
+
+    def _esvaziar(self):
+        self._itens.clear()
+        self.bytes = 0
+
+    # Devolve o valor de `chave`, chamando `calcular()` quando ele não está no
+    # cache. O cálculo é feito fora do lock; se duas sessões pedirem a mesma
+    # chave ao mesmo tempo as duas calculam e fica o último valor.
+    def obter(self, chave, calcular, versao=None):
+        with self._lock:
+            if versao != self.versao:
+                self._esvaziar()
+                self.versao = versao
+            if chave in self._itens:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return self._itens[chave][0]
+            self.falhas += 1
+
+        valor = calcular()
+        tamanho = self.tamanho(valor)
+        with self._lock:
+            if versao != self.versao or tamanho > self.maximo_bytes:
+                return valor
+            if chave in self._itens:
+                self.bytes -= self._itens.pop(chave)[1]
+            self._itens[chave] = (valor, tamanho)
+            self.bytes += tamanho
+            while len(self._itens) > self.maximo_itens or self.bytes > self.maximo_bytes:
+                _, (_, tamanho_removido) = self._itens.popitem(last=False)
+                self.bytes -= tamanho_removido
+        return valor
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                'itens': len(self._itens), 'bytes': self.bytes,
+                'acertos': self.acertos, 'falhas': self.falhas,
+            }
+
+    def limpar(self):
+        with self._lock:
+            self._esvaziar()
+            self.versao = None
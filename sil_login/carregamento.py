@@ -0,0 +1,33 @@
+import io
+import os
+
+import pandas as pd
+
+# Encodings tentados, em ordem, para os arquivos exportados do SIL
+ENCODINGS = ('utf-8', 'latin1')
+
+
+def assinatura_arquivo(caminho):
+    # Identifica a versão de um arquivo pelo mtime e pelo tamanho
+    stat = os.stat(caminho)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def decodificar(conteudo):
+    # Detecta o encoding decodificando o conteúdo uma única vez
+    for encoding in ENCODINGS[:-1]:
+        try:
+            return encoding, conteudo.decode(encoding)
+        except UnicodeDecodeError:
+            pass
+    return ENCODINGS[-1], conteudo.decode(ENCODINGS[-1])
+
+
+def ler_csv(caminho):
+    # Ler o arquivo do disco uma vez e interpretar o texto já decodificado
+    with open(caminho, 'rb') as arquivo:
+        conteudo = arquivo.read()
+    encoding, texto = decodificar(conteudo)
+    df = pd.read_csv(io.StringIO(texto), delimiter=';')
+    return encoding, df
+
@@ -0,0 +1,66 @@
+import os
+
+# Definindo os nomes dos meses
+nome_meses = [
+    'Janeiro', 'Fevereiro', 'Março', 'Abril', 'Maio', 'Junho', 
+    'Julho', 'Agosto', 'Setembro', 'Outubro', 'Novembro', 'Dezembro'
+]
+
+# Coluna de data usada em todos os filtros de período
+COLUNA_DATA = 'Previsão início atendimento (BRA)'
+FORMATO_DATA = '%d/%m/%Y %H:%M:%S'
+
+# Mapeamento do CNPJ das filiais
+mapeamento_CNPJ = {
+    '15.245.792/0001-31': 'SMX MTZ',
+    '15.245.792/0004-84': 'SMX FOR',
+    '15.245.792/0005-65': 'SMX SUA',
+    '15.245.792/0006-46': 'SMX SSZ',
+    '15.245.792/0003-01': 'SMX CWB',
+    '15.245.792/0007-27': 'SMX CXJ'
+}
+
+# Valores unitários de faturamento por CNPJ
+faturamento_por_cnpj = {
+        'SMX MTZ': 1500.00,
+        'SMX FOR': 850.00,
+        'SMX SUA': 900.00,
+        'SMX SSZ': 1250.00,
+        'SMX CWB': 1500.00,
+        'SMX CXJ': 1500.00
+    }
+
+# Definição de regional
+regionais = {
+    'SMX MTZ': 'SUL',
+    'SMX FOR': 'NORDESTE',
+    'SMX SUA': 'NORDESTE',
+    'SMX SSZ': 'SUDESTE',
+    'SMX CWB': 'SUL',
+    'SMX CXJ': 'SUL'
+}
+
+# Origem dos dados. Cada caminho pode ser trocado pela variável de ambiente
+# indicada, sem alterar o código; o padrão são pastas dentro do projeto.
+PASTA_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# SIL_ARQUIVOS: padrão dos CSVs exportados, lido quando não há SharePoint
+PADRAO_ARQUIVOS = os.environ.get('SIL_ARQUIVOS', os.path.join(PASTA_PROJETO, 'SIL Log-In', '*.csv'))
+# SIL_SNAPSHOT: pasta do snapshot Parquet gerado a partir dos CSVs
+PASTA_SNAPSHOT = os.environ.get('SIL_SNAPSHOT', os.path.join(PASTA_PROJETO, 'SIL Snapshot'))
+# SIL_SHAREPOINT_SITE e SIL_SHAREPOINT_PASTA: site e pasta da biblioteca com as
+# exportações, ex.: 'https://empresa.sharepoint.com/sites/Operacoes' e
+# '/sites/Operacoes/Documentos Compartilhados/SIL Log-In'. Quando definidos,
+# os CSVs são sincronizados para a pasta local SIL_CACHE e lidos dela.
+SHAREPOINT_SITE = os.environ.get('SIL_SHAREPOINT_SITE')
+SHAREPOINT_PASTA = os.environ.get('SIL_SHAREPOINT_PASTA')
+PASTA_CACHE = os.environ.get('SIL_CACHE', os.path.join(PASTA_PROJETO, 'SIL Cache'))
+# SIL_MOTOR: 'pandas' calcula os indicadores pelo cubo em memória; 'duckdb'
+# consulta o snapshot Parquet em SQL, sem carregar os meses na memória
+MOTOR_CONSULTA = os.environ.get('SIL_MOTOR', 'pandas')
+
+
+def origem_arquivos():
+    # CSVs lidos pelo painel: a cópia local do SharePoint ou SIL_ARQUIVOS
+    if SHAREPOINT_SITE:
+        return os.path.join(PASTA_CACHE, '*.csv')
+    return PADRAO_ARQUIVOS
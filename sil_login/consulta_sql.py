@@ -0,0 +1,320 @@
+import argparse
+import hashlib
+import json
+import math
+import sys
+import threading
+
+import pandas as pd
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+from sil_login.agregacoes import faturamento_por_mes
+from sil_login.cache_lru import CacheLRU
+from sil_login.configuracao import COLUNA_DATA, PASTA_SNAPSHOT, faturamento_por_cnpj, origem_arquivos
+from sil_login.instrumentacao import etapa
+from sil_login.metricas import SECOES, calcular_todos, carregar, filtro_e_secoes, periodo_do_filtro
+from sil_login.snapshot import caminho_particao, ler_manifesto
+
+# Resultados já calculados por filtro, para a versão atual do snapshot
+MAXIMO_EM_CACHE = 256
+MAXIMO_BYTES_EM_CACHE = 64 * 1024 ** 2
+_cache = CacheLRU(MAXIMO_EM_CACHE, MAXIMO_BYTES_EM_CACHE)
+
+# Conexões abertas por pasta do snapshot
+_conexoes = {}
+_conexoes_lock = threading.Lock()
+
+
+def _texto(valor):
+    return "'" + str(valor).replace("'", "''") + "'"
+
+
+def _expressao_faturamento():
+    # Valor unitário da filial de cada linha, como `faturamento_por_cnpj`
+    casos = ' '.join(f'WHEN {_texto(filial)} THEN {valor!r}' for filial, valor in faturamento_por_cnpj.items())
+    return f'CASE "Filial" {casos} ELSE 0.0 END'
+
+
+def _versao_manifesto(manifesto):
+    return hashlib.sha1(json.dumps(manifesto, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+
+def conectar(pasta_snapshot):
+    # Uma conexão por snapshot, com a visão `programacoes` sobre as partições
+    # Parquet listadas no manifesto; um mês que falhou na reconversão sai do
+    # manifesto e da visão, mesmo que o Parquet antigo continue na pasta. A
+    # visão é recriada quando o manifesto muda. O DuckDB lê só as colunas
+    # usadas e, com os filtros de data, pula os grupos de linhas fora do
+    # período pelas estatísticas do Parquet.
+    if duckdb is None:
+        raise RuntimeError('Instale o pacote duckdb para usar SIL_MOTOR=duckdb')
+    manifesto = ler_manifesto(pasta_snapshot)
+    versao = _versao_manifesto(manifesto)
+    with _conexoes_lock:
+        conexao, versao_visao = _conexoes.get(pasta_snapshot, (None, None))
+        if conexao is None:
+            conexao = duckdb.connect()
+        if versao_visao != versao:
+            arquivos = ', '.join(
+                _texto(caminho_particao(pasta_snapshot, entrada['ano'], entrada['mes']).replace('\\', '/'))
+                for _, entrada in sorted(manifesto.items())
+            )
+            conexao.execute(f"""
+                CREATE OR REPLACE VIEW programacoes AS
+                SELECT
+                    "Número da programação" AS numero,
+                    "Tipo de programação" AS tipo,
+                    "Situação programação" AS situacao,
+                    "Situação prazo programação" AS prazo,
+                    "Filial" AS filial,
+                    "Região" AS regiao,
+                    "{COLUNA_DATA}" AS data,
+                    {_expressao_faturamento()} AS faturamento
+                FROM read_parquet([{arquivos}], union_by_name = true)
+                WHERE "{COLUNA_DATA}" IS NOT NULL
+            """)
+            _conexoes[pasta_snapshot] = (conexao, versao)
+        # Cada consulta usa um cursor próprio, que pode rodar em outra thread
+        return conexao.cursor()
+
+
+def versao_snapshot(pasta_snapshot):
+    # Muda sempre que algum mês do snapshot é convertido de novo
+    return _versao_manifesto(ler_manifesto(pasta_snapshot))
+
+
+def _filtros(regiao='Todos', filial='Todos', ano='Todos', mes=None):
+    # Cláusula WHERE e parâmetros para o filtro do painel
+    condicoes, parametros = ['TRUE'], []
+    if regiao != 'Todos':
+        condicoes.append('regiao = ?')
+        parametros.append(regiao)
+    if filial != 'Todos':
+        condicoes.append('filial = ?')
+        parametros.append(filial)
+    periodo = periodo_do_filtro(ano, mes)
+    if periodo is not None:
+        condicoes.append('data >= ? AND data < ?')
+        parametros.extend(periodo)
+    return ' AND '.join(condicoes), parametros
+
+
+def consultar(cursor, sql, filtros, parametros):
+    return cursor.execute(sql.format(filtros=filtros), parametros).df()
+
+
+def anos_sql(cursor):
+    anos = cursor.execute('SELECT DISTINCT year(data) FROM programacoes ORDER BY 1').fetchall()
+    return [int(ano) for ano, in anos]
+
+
+def indicadores_sql(cursor, filtros, parametros, filial='Todos'):
+    linha = consultar(cursor, """
+        SELECT
+            count(DISTINCT numero) AS total,
+            count(DISTINCT numero) FILTER (WHERE situacao = 'CANCELADA') AS canceladas,
+            count(DISTINCT numero) FILTER (WHERE situacao IS DISTINCT FROM 'CANCELADA') AS atendidas,
+            count(DISTINCT numero) FILTER (
+                WHERE situacao IS DISTINCT FROM 'CANCELADA' AND prazo = 'Atrasado'
+            ) AS atrasadas,
+            coalesce(sum(faturamento) FILTER (WHERE numero IS NOT NULL), 0) AS faturamento_total,
+            coalesce(sum(faturamento) FILTER (WHERE numero IS NOT NULL AND situacao = 'CANCELADA'), 0)
+                AS faturamento_cancelado
+        FROM programacoes
+        WHERE {filtros}
+    """, filtros, parametros).iloc[0]
+
+    total_programacoes = int(linha['total'])
+    total_programacoes_canceladas = int(linha['canceladas'])
+    if filial == 'Todos':
+        faturamento_total = float(linha['faturamento_total'])
+        faturamento_cancelado = float(linha['faturamento_cancelado'])
+    else:
+        faturamento_total = total_programacoes * faturamento_por_cnpj.get(filial, 0)
+        faturamento_cancelado = total_programacoes_canceladas * faturamento_por_cnpj.get(filial, 0)
+
+    return {
+        'total_programacoes': total_programacoes,
+        'total_programacoes_canceladas': total_programacoes_canceladas,
+        'total_programacoes_atendidas': int(linha['atendidas']),
+        'total_programacoes_atrasadas': int(linha['atrasadas']),
+        'faturamento_total': float(faturamento_total),
+        'faturamento_cancelado': float(faturamento_cancelado),
+        'faturamento_atendido': float(faturamento_total - faturamento_cancelado),
+    }
+
+
+def _contagem_nao_canceladas(cursor, filtros, parametros, coluna, nome):
+    # Linhas com número e não canceladas por `coluna`, como `tipos_operacao`
+    return consultar(cursor, f"""
+        SELECT {coluna} AS "{nome}", count(*) AS "Linhas"
+        FROM programacoes
+        WHERE {{filtros}} AND numero IS NOT NULL AND situacao IS DISTINCT FROM 'CANCELADA'
+        GROUP BY {coluna}
+        ORDER BY {coluna} NULLS LAST
+    """, filtros, parametros)
+
+
+def faturamento_por_filial_sql(cursor, filtros, parametros):
+    df_faturamento_por_filial = consultar(cursor, """
+        SELECT filial AS "Filial", sum(faturamento) AS "Faturamento Atendido"
+        FROM programacoes
+        WHERE {filtros} AND filial IS NOT NULL
+        GROUP BY filial
+        ORDER BY filial
+    """, filtros, parametros)
+    faturamento_total_periodo = df_faturamento_por_filial['Faturamento Atendido'].sum()
+    df_faturamento_por_filial['Porcentagem'] = df_faturamento_por_filial['Faturamento Atendido'] / faturamento_total_periodo * 100
+    return df_faturamento_por_filial
+
+
+def atrasos_por_filial_sql(cursor, filtros, parametros):
+    atrasos = consultar(cursor, """
+        SELECT filial AS "Filial", count(*) AS "Linhas"
+        FROM programacoes
+        WHERE {filtros} AND prazo = 'Atrasado' AND filial IS NOT NULL
+        GROUP BY filial
+        ORDER BY filial
+    """, filtros, parametros)
+    return atrasos.set_index('Filial')['Linhas']
+
+
+def faturamento_mensal_sql(cursor, filtros, parametros):
+    # Faturamento de todas as linhas e das canceladas por (Ano, Mês)
+    return consultar(cursor, """
+        SELECT
+            year(data) AS "Ano",
+            month(data) AS "Mês",
+            sum(faturamento) AS "Faturamento Atendido",
+            coalesce(sum(faturamento) FILTER (WHERE situacao = 'CANCELADA'), 0) AS "Faturamento Cancelado"
+        FROM programacoes
+        WHERE {filtros}
+        GROUP BY ALL
+    """, filtros, parametros)
+
+
+# Consultas do painel em SQL sobre o snapshot, com a mesma interface de
+# `metricas.MotorCubo` e os mesmos números
+class MotorSQL:
+    def __init__(self, pasta_snapshot):
+        self.pasta_snapshot = pasta_snapshot
+        self.versao = versao_snapshot(pasta_snapshot)
+
+    def vazio(self):
+        return not ler_manifesto(self.pasta_snapshot)
+
+    def anos(self):
+        return anos_sql(conectar(self.pasta_snapshot))
+
+    def regioes(self):
+        regioes = conectar(self.pasta_snapshot).execute(
+            'SELECT DISTINCT regiao FROM programacoes WHERE regiao IS NOT NULL ORDER BY 1'
+        ).fetchall()
+        return [regiao for regiao, in regioes]
+
+    def filiais(self, regiao='Todos'):
+        filtros, parametros = _filtros(regiao)
+        filiais = conectar(self.pasta_snapshot).execute(
+            f'SELECT DISTINCT filial FROM programacoes WHERE {filtros} ORDER BY 1 NULLS LAST', parametros
+        ).fetchall()
+        return [filial for filial, in filiais]
+
+    def calcular(self, regiao='Todos', filial='Todos', ano='Todos', mes=None, medicoes=None, secao=None):
+        filtro, secoes = filtro_e_secoes(secao, regiao, filial, ano, mes)
+        return _cache.obter(
+            (secao,) + filtro, lambda: calcular_sql(self.pasta_snapshot, *filtro, medicoes=medicoes, secoes=secoes),
+            self.versao,
+        )
+
+    def estatisticas_cache(self):
+        return _cache.estatisticas()
+
+    def resumo(self):
+        return 'Consultas em SQL (DuckDB) sobre o snapshot'
+
+
+# Mesmo resultado de `metricas.calcular`, consultando o snapshot em SQL
+def calcular_sql(pasta_snapshot, regiao='Todos', filial='Todos', ano='Todos', mes=None, anos=None, medicoes=None,
+                 secoes=tuple(SECOES)):
+    cursor = conectar(pasta_snapshot)
+    filtros, parametros = _filtros(regiao, filial, ano, mes)
+    resultado = {'filtro': {'regiao': regiao, 'filial': filial, 'ano': ano, 'mes': mes}, 'secoes': tuple(secoes)}
+    if 'indicadores' in secoes:
+        with etapa(medicoes, 'indicadores'):
+            resultado['indicadores'] = indicadores_sql(cursor, filtros, parametros, filial)
+    if 'operacao' in secoes:
+        with etapa(medicoes, 'agregacoes_graficos'):
+            resultado['tipos_operacao'] = _contagem_nao_canceladas(cursor, filtros, parametros, 'tipo', 'Tipo de programação')
+            resultado['pontualidade'] = _contagem_nao_canceladas(cursor, filtros, parametros, 'prazo', 'Situação prazo programação')
+    if 'filiais' in secoes and filial == 'Todos':
+        with etapa(medicoes, 'agregacoes_filiais'):
+            resultado['faturamento_por_filial'] = faturamento_por_filial_sql(cursor, filtros, parametros)
+            resultado['atrasos_por_filial'] = atrasos_por_filial_sql(cursor, filtros, parametros)
+    if 'faturamento_mes' in secoes and mes is None:
+        with etapa(medicoes, 'faturamento_mensal'):
+            if anos is None:
+                anos = anos_sql(cursor) if ano == 'Todos' else [ano]
+            filtros_mensal, parametros_mensal = _filtros(regiao, filial, ano)
+            mensal = faturamento_mensal_sql(cursor, filtros_mensal, parametros_mensal)
+            resultado['faturamento_por_mes'] = faturamento_por_mes(mensal, anos)
+    return resultado
+
+
+def _comparavel(valor):
+    # Tabela em registros ordenados e com os rótulos vazios iguais, para
+    # comparar resultados que só diferem na ordem das linhas ou nos tipos
+    if isinstance(valor, pd.Series):
+        valor = valor.reset_index()
+    registros = []
+    for registro in valor.astype(object).to_dict('records'):
+        registros.append(tuple(
+            None if isinstance(item, float) and math.isnan(item) else item.item() if hasattr(item, 'item') else item
+            for item in registro.values()
+        ))
+    return sorted(registros, key=repr)
+
+
+# Compara o resultado do cubo em memória com o da consulta SQL para todas as
+# combinações de filtro. Retorna a lista de diferenças encontradas.
+def comparar(padrao_arquivos, pasta_snapshot):
+    cubo, _, _ = carregar(padrao_arquivos, pasta_snapshot)
+    motor = MotorSQL(pasta_snapshot)
+    anos = motor.anos()
+    diferencas = []
+    combinacoes = 0
+    for esperado in calcular_todos(cubo):
+        filtro = esperado['filtro']
+        obtido = calcular_sql(pasta_snapshot, **filtro, anos=anos if filtro['ano'] == 'Todos' else None)
+        combinacoes += 1
+        if obtido['indicadores'] != esperado['indicadores']:
+            diferencas.append((filtro, 'indicadores', esperado['indicadores'], obtido['indicadores']))
+        for nome in esperado:
+            if nome in ('filtro', 'secoes', 'indicadores'):
+                continue
+            if nome not in obtido or _comparavel(obtido[nome]) != _comparavel(esperado[nome]):
+                diferencas.append((filtro, nome, esperado[nome], obtido.get(nome)))
+    return combinacoes, diferencas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m sil_login.consulta_sql',
+        description='Confere se as consultas SQL dão os mesmos números do cubo em memória.',
+    )
+    parser.add_argument('--arquivos', default=origem_arquivos(), help='padrão dos CSVs exportados (padrão: SIL_ARQUIVOS)')
+    parser.add_argument('--snapshot', default=PASTA_SNAPSHOT, help='pasta do snapshot Parquet (padrão: SIL_SNAPSHOT)')
+    args = parser.parse_args(argv)
+
+    combinacoes, diferencas = comparar(args.arquivos, args.snapshot)
+    for filtro, nome, esperado, obtido in diferencas[:20]:
+        print(f'{filtro} {nome}:\n  cubo: {esperado}\n  sql:  {obtido}', file=sys.stderr)
+    print(f'{combinacoes} combinações comparadas, {len(diferencas)} diferenças')
+    return 1 if diferencas else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,157 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from sil_login.configuracao import COLUNA_DATA, faturamento_por_cnpj
+
+# Dimensões do cubo de indicadores
+DIMENSOES = [
+    'Ano', 'Mês', 'Região', 'Filial', 'Situação programação',
+    'Situação prazo programação', 'Tipo de programação',
+]
+
+# Separa as linhas sem 'Número da programação', que entram no faturamento
+# e nas contagens de linhas, mas não nas contagens de programações distintas
+COM_NUMERO = 'Com número'
+
+CHAVES = DIMENSOES + [COM_NUMERO]
+
+# Cubos parciais por partição e o último cubo montado
+_parciais = {}
+_montado = (None, None)
+_cache_lock = threading.Lock()
+
+
+# Agrega um mês do snapshot nas dimensões do cubo. Cada célula guarda o número
+# de linhas, o faturamento e os números de programação distintos da célula.
+def cubo_parcial(data):
+    data = data[data[COLUNA_DATA].notna()]
+    datas = data[COLUNA_DATA]
+    base = pd.DataFrame({
+        'Ano': datas.dt.year,
+        'Mês': datas.dt.month,
+        'Região': data['Região'],
+        'Filial': data['Filial'],
+        'Situação programação': data['Situação programação'],
+        'Situação prazo programação': data['Situação prazo programação'],
+        'Tipo de programação': data['Tipo de programação'],
+        COM_NUMERO: data['Número da programação'].notna(),
+        'Número': data['Número da programação'],
+        'Faturamento': data['Filial'].map(faturamento_por_cnpj).astype('float64').fillna(0),
+    })
+    grupos = base.groupby(CHAVES, dropna=False, sort=False, observed=True)
+    parcial = grupos.agg(Linhas=('Faturamento', 'size'), Faturamento=('Faturamento', 'sum'))
+    parcial['Números'] = grupos['Número'].unique()
+    return parcial.reset_index()
+
+
+# Junta os cubos parciais em um único cubo. Números de programação que aparecem
+# em uma só célula viram uma contagem ('Exclusivas'); os que aparecem em mais
+# de uma célula são guardados como códigos ('Compartilhadas'), para que a
+# contagem de distintos em qualquer fatia continue exata.
+def juntar_parciais(parciais):
+    if not parciais:
+        return None
+    juntos = pd.concat(parciais, ignore_index=True)
+    celula = juntos.groupby(CHAVES, dropna=False, sort=False, observed=True).ngroup()
+
+    cubo = juntos.groupby(celula)[['Linhas', 'Faturamento']].sum()
+    cubo = juntos.groupby(celula)[CHAVES].first().join(cubo)
+
+    numeros = pd.DataFrame({'Célula': celula, 'Número': juntos['Números']}).explode('Número')
+    numeros = numeros[numeros['Número'].notna()].drop_duplicates()
+    codigos, _ = pd.factorize(numeros['Número'])
+    numeros['Código'] = codigos
+    compartilhado = numeros['Código'].duplicated(keep=False)
+
+    cubo['Exclusivas'] = numeros[~compartilhado].groupby('Célula').size()
+    cubo['Exclusivas'] = cubo['Exclusivas'].fillna(0).astype('int64')
+    compartilhadas = numeros[compartilhado].groupby('Célula')['Código']
+    compartilhadas = pd.Series({c: codigos.to_numpy() for c, codigos in compartilhadas}, dtype=object)
+    cubo['Compartilhadas'] = compartilhadas.reindex(cubo.index)
+    return cubo.reset_index(drop=True)
+
+
+# Monta o cubo a partir das partições do snapshot, lista de (chave, DataFrame).
+# Só as partições com chave nova são reagregadas; o cubo montado fica em
+# cache enquanto nenhuma partição mudar.
+def atualizar_cubo(particoes):
+    global _montado
+    chaves = tuple(chave for chave, _ in particoes)
+    with _cache_lock:
+        if _montado[0] == chaves:
+            return _montado[1]
+
+    parciais = []
+    for chave, df in particoes:
+        with _cache_lock:
+            parcial = _parciais.get(chave)
+        if parcial is None:
+            parcial = cubo_parcial(df)
+        parciais.append((chave, parcial))
+
+    cubo = juntar_parciais([parcial for _, parcial in parciais])
+    with _cache_lock:
+        _parciais.clear()
+        _parciais.update(parciais)
+        _montado = (chaves, cubo)
+    return cubo
+
+
+# Seleciona as células do cubo para a região, filial e período escolhidos
+def fatiar(cubo, regiao='Todos', filial='Todos', ano='Todos', mes=None):
+    mascara = np.ones(len(cubo), dtype=bool)
+    if regiao != 'Todos':
+        mascara &= (cubo['Região'] == regiao).to_numpy()
+    if filial != 'Todos':
+        mascara &= (cubo['Filial'] == filial).to_numpy()
+    if ano != 'Todos':
+        mascara &= (cubo['Ano'] == ano).to_numpy()
+    if mes is not None:
+        mascara &= (cubo['Mês'] == mes).to_numpy()
+    return cubo[mascara]
+
+
+# Quantidade de programações distintas em uma fatia do cubo
+def contar_programacoes(fatia):
+    compartilhadas = fatia['Compartilhadas'].dropna()
+    distintas_compartilhadas = len(np.unique(np.concatenate(compartilhadas.tolist()))) if len(compartilhadas) else 0
+    return int(fatia['Exclusivas'].sum()) + distintas_compartilhadas
+
+
+# Calcula os indicadores das caixas do painel a partir de uma fatia do cubo
+def indicadores(fatia, filial='Todos'):
+    validas = fatia[fatia[COM_NUMERO]]
+    canceladas = validas[validas['Situação programação'] == 'CANCELADA']
+    atendidas = validas[validas['Situação programação'] != 'CANCELADA']
+    atrasadas = atendidas[atendidas['Situação prazo programação'] == 'Atrasado']
+
+    total_programacoes = contar_programacoes(validas)
+    total_programacoes_canceladas = contar_programacoes(canceladas)
+
+    # Calcular faturamento total e cancelado
+    if filial == 'Todos':
+        faturamento_total = validas['Faturamento'].sum()
+        faturamento_cancelado = canceladas['Faturamento'].sum()
+    else:
+        faturamento_total = total_programacoes * faturamento_por_cnpj.get(filial, 0)
+        faturamento_cancelado = total_programacoes_canceladas * faturamento_por_cnpj.get(filial, 0)
+
+    return {
+        'total_programacoes': total_programacoes,
+        'total_programacoes_canceladas': total_programacoes_canceladas,
+        'total_programacoes_atendidas': contar_programacoes(atendidas),
+        'total_programacoes_atrasadas': contar_programacoes(atrasadas),
+        'faturamento_total': float(faturamento_total),
+        'faturamento_cancelado': float(faturamento_cancelado),
+        'faturamento_atendido': float(faturamento_total - faturamento_cancelado),
+    }
+
+
+def limpar_cache():
+    # Esquecer os cubos parciais e o último cubo montado
+    global _montado
+    with _cache_lock:
+        _parciais.clear()
+        _montado = (None, None)
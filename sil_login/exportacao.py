@@ -0,0 +1,243 @@
+import argparse
+import io
+import os
+import sys
+import tempfile
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc
+import pyarrow.parquet as pq
+
+from sil_login.configuracao import COLUNA_DATA, FORMATO_DATA, PASTA_SNAPSHOT, origem_arquivos
+from sil_login.metricas import filtro_normalizado, periodo_do_filtro
+from sil_login.snapshot import atualizar_snapshot, caminhos_particoes, limites_periodo
+
+FORMATOS = ('csv', 'parquet')
+
+# Linhas lidas, filtradas e gravadas de cada vez; limita a memória usada na
+# exportação, qualquer que seja o total de linhas
+TAMANHO_LOTE = 50_000
+
+# Formato dos números no CSV, como nas exportações do SIL: valores em reais
+# com separador de milhar e duas casas ("100.000,00"), demais números com
+# duas casas e documentos com os zeros à esquerda
+COLUNAS_MONETARIAS = ['Valor da viagem']
+CASAS_DECIMAIS_CSV = '%.2f'
+LARGURA_DOCUMENTOS = {'CPF motorista programado': 11}
+
+
+def _reais(valor):
+    if pd.isna(valor):
+        return ''
+    return f'{valor:,.2f}'.replace(',', '_').replace('.', ',').replace('_', '.')
+
+# Maior arquivo entregue pelo botão do painel. O Streamlit guarda o arquivo
+# inteiro na memória do servidor; exportações maiores ficam para a linha de
+# comando, que grava direto no disco.
+MAXIMO_BYTES_PAINEL = 200 * 1024 ** 2
+
+
+def _esquema(caminho):
+    if caminho.endswith('.arrow'):
+        return pa.ipc.open_file(pa.memory_map(caminho)).schema
+    return pq.read_schema(caminho)
+
+
+def _lotes(caminho, tamanho_lote, periodo=None):
+    # Lotes de no máximo `tamanho_lote` linhas de uma partição, só com as
+    # linhas com data em `periodo`. As partições são ordenadas pela data, então
+    # o trecho do período é achado por busca binária, sem varrer as outras
+    # linhas. A cópia Arrow é mapeada em memória e recortada sem cópia; o
+    # Parquet é lido em lotes até o fim do trecho.
+    if caminho.endswith('.arrow'):
+        tabela = pa.ipc.open_file(pa.memory_map(caminho)).read_all()
+        inicio, fim = limites_periodo(tabela.column(COLUNA_DATA), periodo)
+        yield from tabela.slice(inicio, fim - inicio).to_batches(max_chunksize=tamanho_lote)
+    else:
+        inicio, fim = limites_periodo(pq.read_table(caminho, columns=[COLUNA_DATA]).column(COLUNA_DATA), periodo)
+        if inicio >= fim:
+            return
+        posicao = 0
+        for lote in pq.ParquetFile(caminho).iter_batches(batch_size=tamanho_lote):
+            de, ate = max(inicio, posicao), min(fim, posicao + lote.num_rows)
+            if de < ate:
+                yield lote.slice(de - posicao, ate - de)
+            posicao += lote.num_rows
+            if posicao >= fim:
+                break
+
+
+def _tipo_comum(nome, tipos):
+    # Tipo que comporta todos os `tipos` da coluna: numéricos são promovidos
+    # ao mais largo (int8 e int16 viram int16, float e double viram double);
+    # só uma coluna com texto em um mês e números em outro vira texto
+    tipos = [tipo for tipo in tipos if tipo != pa.null()]
+    if not tipos:
+        return pa.string()
+    try:
+        unificado = pa.unify_schemas([pa.schema([pa.field(nome, tipo)]) for tipo in tipos], promote_options='permissive')
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.string()
+    return unificado.field(nome).type
+
+
+# Colunas de todas as partições, na ordem em que aparecem, com um tipo comum
+# (ver `_tipo_comum`). Categóricas viram texto.
+def esquema_comum(caminhos):
+    tipos = {}
+    for caminho in caminhos:
+        for campo in _esquema(caminho):
+            tipo = campo.type.value_type if pa.types.is_dictionary(campo.type) else campo.type
+            tipos.setdefault(campo.name, set()).add(tipo)
+    return pa.schema([pa.field(nome, _tipo_comum(nome, tipos_coluna)) for nome, tipos_coluna in tipos.items()])
+
+
+def mascara_filtro(lote, regiao='Todos', filial='Todos'):
+    # Linhas do lote na região e na filial escolhidas
+    colunas = lote.select(['Região', 'Filial']).to_pandas()
+    mascara = pd.Series(True, index=colunas.index)
+    if regiao != 'Todos':
+        mascara &= colunas['Região'] == regiao
+    if filial != 'Todos':
+        mascara &= colunas['Filial'] == filial
+    return mascara.to_numpy()
+
+
+def linhas_filtradas(pasta_snapshot, regiao='Todos', filial='Todos', ano='Todos', mes=None, tamanho_lote=TAMANHO_LOTE):
+    # Percorre as mesmas linhas consideradas pelo painel (com data, no
+    # período, na região e na filial) em DataFrames de até `tamanho_lote`
+    # linhas. Meses fora do período nem são abertos.
+    regiao, filial, ano, mes = filtro_normalizado(regiao, filial, ano, mes)
+    periodo = periodo_do_filtro(ano, mes)
+    for caminho in caminhos_particoes(pasta_snapshot, periodo):
+        for lote in _lotes(caminho, tamanho_lote, periodo):
+            if regiao == 'Todos' and filial == 'Todos':
+                if lote.num_rows:
+                    yield lote.to_pandas()
+                continue
+            mascara = mascara_filtro(lote, regiao, filial)
+            if mascara.any():
+                yield lote.filter(pa.array(mascara)).to_pandas()
+
+
+def formatar_csv(df):
+    # Colunas float só com valores inteiros (identificadores com células
+    # vazias, que o pandas lê como float) voltam a ser inteiras, para não
+    # saírem como "779212,0"; os valores em reais saem como no SIL
+    for coluna in df.columns:
+        serie = df[coluna]
+        if coluna in COLUNAS_MONETARIAS:
+            if pd.api.types.is_float_dtype(serie):
+                df[coluna] = serie.map(_reais)
+        elif pd.api.types.is_float_dtype(serie) and (serie.dropna() % 1 == 0).all():
+            serie = serie.astype('Int64')
+            if coluna in LARGURA_DOCUMENTOS:
+                serie = serie.astype('string').str.zfill(LARGURA_DOCUMENTOS[coluna])
+            df[coluna] = serie
+    return df
+
+
+# Grava as linhas do filtro em `destino` (caminho ou arquivo binário aberto),
+# lote a lote: CSV com ';' e latin1, como as exportações do SIL, ou Parquet
+# com um grupo de linhas por lote. Retorna a quantidade de linhas gravadas.
+def exportar(pasta_snapshot, destino, formato='csv', regiao='Todos', filial='Todos', ano='Todos', mes=None,
+             tamanho_lote=TAMANHO_LOTE):
+    if formato not in FORMATOS:
+        raise ValueError(f'Formato deve ser um de {FORMATOS}, não {formato!r}')
+    esquema = esquema_comum(caminhos_particoes(pasta_snapshot))
+    lotes = linhas_filtradas(pasta_snapshot, regiao, filial, ano, mes, tamanho_lote)
+
+    linhas = 0
+    if formato == 'csv':
+        if isinstance(destino, str):
+            saida = open(destino, 'w', encoding='latin1', errors='replace', newline='')
+        else:
+            saida = io.TextIOWrapper(destino, encoding='latin1', errors='replace', newline='', write_through=True)
+        try:
+            for df in lotes:
+                formatar_csv(df.reindex(columns=esquema.names)).to_csv(
+                    saida, sep=';', index=False, header=linhas == 0, decimal=',', date_format=FORMATO_DATA,
+                    float_format=CASAS_DECIMAIS_CSV,
+                )
+                linhas += len(df)
+            if linhas == 0:
+                saida.write(';'.join(esquema.names) + '\n')
+        finally:
+            if isinstance(destino, str):
+                saida.close()
+            else:
+                saida.detach()
+    else:
+        with pq.ParquetWriter(destino, esquema) as escritor:
+            for df in lotes:
+                tabela = pa.Table.from_pandas(df.reindex(columns=esquema.names), preserve_index=False)
+                escritor.write_table(tabela.cast(esquema))
+                linhas += len(df)
+    return linhas
+
+
+class _ArquivoTemporario(io.BufferedReader):
+    # Leitor de um arquivo temporário que apaga o arquivo ao ser fechado ou
+    # coletado. O arquivo só pode ser apagado depois de fechado no Windows.
+    def close(self):
+        caminho = self.raw.name
+        try:
+            super().close()
+        finally:
+            try:
+                os.remove(caminho)
+            except OSError:
+                pass
+
+
+# Exporta para um arquivo temporário e o devolve aberto para leitura no
+# início, em um tipo que o st.download_button aceita; o arquivo é apagado
+# quando o leitor é fechado. O Streamlit lê o arquivo inteiro para a memória
+# do servidor antes de enviá-lo, então com `maximo_bytes` uma exportação
+# maior que isso é recusada com ValueError.
+def exportar_temporario(pasta_snapshot, formato='csv', regiao='Todos', filial='Todos', ano='Todos', mes=None,
+                        maximo_bytes=None):
+    descritor, caminho = tempfile.mkstemp(prefix='sil-', suffix=f'.{formato}')
+    try:
+        with os.fdopen(descritor, 'wb') as arquivo:
+            exportar(pasta_snapshot, arquivo, formato, regiao, filial, ano, mes)
+        tamanho = os.path.getsize(caminho)
+        if maximo_bytes is not None and tamanho > maximo_bytes:
+            raise ValueError(
+                f'A exportação tem {tamanho / 1024 ** 2:,.0f} MB, acima do limite de '
+                f'{maximo_bytes / 1024 ** 2:,.0f} MB do painel; use python -m sil_login.exportacao'
+            )
+        return _ArquivoTemporario(open(caminho, 'rb', buffering=0))
+    except BaseException:
+        os.remove(caminho)
+        raise
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m sil_login.exportacao',
+        description='Exporta as linhas de um filtro do painel em CSV ou Parquet.',
+    )
+    parser.add_argument('saida', help='arquivo gerado')
+    parser.add_argument('--formato', choices=FORMATOS, help='padrão: pela extensão do arquivo de saída')
+    parser.add_argument('--regiao', default='Todos')
+    parser.add_argument('--filial', default='Todos')
+    parser.add_argument('--ano', default='Todos')
+    parser.add_argument('--mes', type=int, help='número do mês; sem ele, o ano inteiro')
+    parser.add_argument('--arquivos', default=origem_arquivos(), help='padrão dos CSVs exportados (padrão: SIL_ARQUIVOS)')
+    parser.add_argument('--snapshot', default=PASTA_SNAPSHOT, help='pasta do snapshot Parquet (padrão: SIL_SNAPSHOT)')
+    args = parser.parse_args(argv)
+    if args.mes is not None and args.ano == 'Todos':
+        parser.error('--mes exige --ano')
+
+    formato = args.formato or ('parquet' if args.saida.lower().endswith('.parquet') else 'csv')
+    for caminho, erro in atualizar_snapshot(args.arquivos, args.snapshot):
+        print(f'Erro ao ler o arquivo {caminho}: {erro}', file=sys.stderr)
+    linhas = exportar(args.snapshot, args.saida, formato, args.regiao, args.filial, args.ano, args.mes)
+    print(f'{linhas:,} linhas gravadas em {args.saida}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,115 @@
+import plotly.express as px
+
+from sil_login.cache_lru import CacheLRU
+
+# Figuras já montadas por filtro, para a versão atual dos dados
+MAXIMO_EM_CACHE = 64
+MAXIMO_BYTES_EM_CACHE = 32 * 1024 ** 2
+
+# Legenda horizontal abaixo dos gráficos de pizza
+LEGENDA = dict(orientation="h", yanchor="bottom", y=-0.2, xanchor="center", x=0.5)
+
+
+# Gráfico de barras de faturamento por mês. `coluna` é 'Faturamento Atendido'
+# ou 'Faturamento Cancelado'; com `por_ano`, cada ano recebe uma cor.
+def grafico_faturamento_mes(df_faturamento_por_mes, coluna, por_ano=False):
+    # Adiciona uma cor diferente para cada ano quando todos os anos são exibidos
+    cor_ano = {'color': 'Ano'} if por_ano else {}
+    return px.bar(
+        df_faturamento_por_mes, 
+        x='Nome Mês', 
+        y=coluna, 
+        text=coluna, 
+        labels={coluna: f'{coluna} (R$)'},
+        **cor_ano
+    )
+
+
+def grafico_tipos_operacao(tipos_operacao):
+    fig_tipos_operacao = px.pie(tipos_operacao, names='Tipo de programação', values='Linhas', title='Tipos de Operação')
+    fig_tipos_operacao.update_layout(showlegend=True, legend=LEGENDA)
+    return fig_tipos_operacao
+
+
+def grafico_pontualidade(pontualidade):
+    fig_prazo_operacoes = px.pie(
+        pontualidade,
+        names='Situação prazo programação',
+        values='Linhas',
+        title='Pontualidade',
+        color='Situação prazo programação',
+        color_discrete_map={
+            'No prazo': 'green',
+            'Atrasado': 'red'
+        }
+    )
+    fig_prazo_operacoes.update_layout(showlegend=True, legend=LEGENDA)
+    return fig_prazo_operacoes
+
+
+def grafico_faturamento_filial(df_faturamento_por_filial):
+    fig_faturamento_filial = px.pie(
+        df_faturamento_por_filial, 
+        names='Filial',
+        values='Porcentagem',
+        title='Atendimento por Filial'
+    )
+    fig_faturamento_filial.update_traces(textinfo='percent+label')
+    fig_faturamento_filial.update_layout(showlegend=True, legend=LEGENDA)
+    return fig_faturamento_filial
+
+
+def grafico_atrasos_filial(programacoes_atrasadas_por_filial):
+    fig_programacoes_atrasadas = px.bar(
+        programacoes_atrasadas_por_filial, 
+        x=programacoes_atrasadas_por_filial.index, 
+        y=programacoes_atrasadas_por_filial.values, 
+        text=programacoes_atrasadas_por_filial.values,
+        labels={'x': 'Filial', 'y': 'Programações Atrasadas'}
+    )
+    fig_programacoes_atrasadas.update_traces(texttemplate='%{text}', textposition='outside')
+    fig_programacoes_atrasadas.update_layout(title='Atrasos por Filial', xaxis_title='', yaxis_title='')
+    return fig_programacoes_atrasadas
+
+
+# Monta todas as figuras de um resultado de `metricas.calcular`
+def montar_graficos(resultado):
+    graficos = {}
+    if 'tipos_operacao' in resultado:
+        graficos['tipos_operacao'] = grafico_tipos_operacao(resultado['tipos_operacao'])
+        graficos['pontualidade'] = grafico_pontualidade(resultado['pontualidade'])
+    if 'faturamento_por_mes' in resultado:
+        por_ano = resultado['filtro']['ano'] == 'Todos'
+        graficos['faturamento_mes'] = grafico_faturamento_mes(resultado['faturamento_por_mes'], 'Faturamento Atendido', por_ano)
+        graficos['faturamento_cancelado_mes'] = grafico_faturamento_mes(resultado['faturamento_por_mes'], 'Faturamento Cancelado', por_ano)
+    if len(resultado.get('faturamento_por_filial', ())):
+        graficos['faturamento_filial'] = grafico_faturamento_filial(resultado['faturamento_por_filial'])
+    if len(resultado.get('atrasos_por_filial', ())):
+        graficos['atrasos_filial'] = grafico_atrasos_filial(resultado['atrasos_por_filial'])
+    return graficos
+
+
+def tamanho_graficos(graficos):
+    # Bytes do JSON que seria enviado ao navegador
+    return sum(len(figura.to_json()) for figura in graficos.values())
+
+
+_cache = CacheLRU(MAXIMO_EM_CACHE, MAXIMO_BYTES_EM_CACHE, tamanho_graficos)
+
+
+# Devolve as figuras de um resultado, reaproveitando as já montadas para o
+# mesmo filtro e as mesmas seções enquanto `versao_dados` não muda. As figuras
+# em cache são compartilhadas e não devem ser alteradas por quem as recebe.
+def graficos_em_cache(resultado, versao_dados):
+    filtro = resultado['filtro']
+    chave = (resultado.get('secoes'), filtro['regiao'], filtro['filial'], filtro['ano'], filtro['mes'])
+    return _cache.obter(chave, lambda: montar_graficos(resultado), versao_dados)
+
+
+def estatisticas_cache():
+    return _cache.estatisticas()
+
+
+def limpar_cache():
+    # Esquecer as figuras já montadas
+    _cache.limpar()
@@ -0,0 +1,72 @@
+import contextlib
+import json
+import logging
+import os
+import time
+import uuid
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger('sil_login.desempenho')
+
+
+def memoria_processo_mb():
+    # Memória residente do processo, ou None quando não há como medir
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 1024 ** 2
+    try:
+        with open('/proc/self/statm') as arquivo:
+            return int(arquivo.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class _Etapa:
+    def __init__(self, medicoes, nome, linhas_entrada):
+        self.medicoes = medicoes
+        self.registro = {'etapa': nome, 'linhas_entrada': linhas_entrada, 'linhas_saida': None}
+
+    def __enter__(self):
+        self.memoria = memoria_processo_mb()
+        self.inicio = time.perf_counter()
+        return self.registro
+
+    def __exit__(self, *_):
+        self.registro['segundos'] = round(time.perf_counter() - self.inicio, 4)
+        memoria = memoria_processo_mb()
+        if memoria is not None and self.memoria is not None:
+            self.registro['memoria_mb'] = round(memoria - self.memoria, 2)
+        self.medicoes.append(self.registro)
+        return False
+
+
+# Mede uma etapa do painel. Com `medicoes` igual a None a medição está
+# desligada e o custo é só o de entrar em um contexto vazio. O dicionário
+# devolvido pelo `with` aceita 'linhas_saida' e outros campos da etapa.
+def etapa(medicoes, nome, linhas_entrada=None):
+    if medicoes is None:
+        return contextlib.nullcontext({})
+    return _Etapa(medicoes, nome, linhas_entrada)
+
+
+def configurar_log():
+    # Garante que as linhas de desempenho apareçam no terminal do servidor
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s %(name)s %(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+
+# Emite uma linha JSON por etapa e uma com o total da execução
+def registrar(medicoes, **contexto):
+    execucao = uuid.uuid4().hex[:8]
+    for registro in medicoes:
+        logger.info(json.dumps({'execucao': execucao, **contexto, **registro}, ensure_ascii=False, default=str))
+    total = round(sum(registro['segundos'] for registro in medicoes), 4)
+    logger.info(json.dumps({'execucao': execucao, **contexto, 'etapa': 'total', 'segundos': total}, ensure_ascii=False, default=str))
+    return execucao
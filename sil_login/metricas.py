@@ -0,0 +1,213 @@
+import hashlib
+
+import pandas as pd
+
+from sil_login.agregacoes import (
+    anos_disponiveis, atrasos_por_filial, faturamento_mensal_por_filial, faturamento_por_filial,
+    faturamento_por_mes, pontualidade, tipos_operacao,
+)
+from sil_login.cache_lru import CacheLRU
+from sil_login.configuracao import MOTOR_CONSULTA, nome_meses
+from sil_login.cubo import atualizar_cubo, fatiar, indicadores
+from sil_login.instrumentacao import etapa
+from sil_login.snapshot import atualizar_snapshot, ler_particoes
+from sil_login.tratamento import COLUNAS_PAINEL, memoria_mb
+
+# Resultados já calculados por filtro, para a versão atual dos dados
+MAXIMO_EM_CACHE = 256
+MAXIMO_BYTES_EM_CACHE = 64 * 1024 ** 2
+_cache = CacheLRU(MAXIMO_EM_CACHE, MAXIMO_BYTES_EM_CACHE)
+
+
+# Atualiza o snapshot a partir dos CSVs e monta o cubo de indicadores.
+# Retorna o cubo (ou None), as partições lidas e os erros de conversão.
+# Com `medicoes` (lista), registra o tempo de cada etapa nela.
+def carregar(padrao_arquivos, pasta_snapshot, medicoes=None):
+    with etapa(medicoes, 'snapshot'):
+        erros = atualizar_snapshot(padrao_arquivos, pasta_snapshot)
+    with etapa(medicoes, 'leitura_snapshot') as medicao:
+        particoes = ler_particoes(pasta_snapshot, COLUNAS_PAINEL)
+        medicao['linhas_saida'] = sum(len(df) for _, df in particoes)
+    with etapa(medicoes, 'cubo', medicao.get('linhas_saida')) as medicao:
+        cubo = atualizar_cubo(particoes)
+        medicao['linhas_saida'] = None if cubo is None else len(cubo)
+    return cubo, particoes, erros
+
+
+def versao_dados(particoes):
+    # Identifica o conjunto de partições lidas; muda quando algum mês muda
+    chaves = repr(tuple(chave for chave, _ in particoes))
+    return hashlib.sha1(chaves.encode('utf-8')).hexdigest()[:12]
+
+
+def regioes_disponiveis(cubo):
+    return cubo['Região'].dropna().unique().tolist()
+
+
+def filiais_disponiveis(cubo, regiao='Todos'):
+    # Filiais da região selecionada
+    return fatiar(cubo, regiao=regiao)['Filial'].unique().tolist()
+
+
+def numero_do_mes(mes):
+    # Aceita o nome do mês ('Março') ou o número (3); None seleciona o ano todo
+    if mes is None or isinstance(mes, int):
+        return mes
+    return nome_meses.index(mes) + 1
+
+
+# Seções do painel e os filtros de que cada uma depende. Um filtro fora da
+# lista não muda o resultado da seção e é trocado pelo valor padrão, para que
+# a seção seja reaproveitada quando só ele muda.
+SECOES = {
+    'indicadores': ('regiao', 'filial', 'ano', 'mes'),
+    'operacao': ('regiao', 'filial', 'ano', 'mes'),
+    'filiais': ('regiao', 'ano', 'mes'),
+    'faturamento_mes': ('regiao', 'filial', 'ano'),
+}
+FILTRO_PADRAO = {'regiao': 'Todos', 'filial': 'Todos', 'ano': 'Todos', 'mes': None}
+
+
+# Calcula os resultados do painel para um filtro. `ano` é 'Todos' ou um ano;
+# `mes` é None para filtrar pelo ano inteiro. `secoes` limita o cálculo a
+# algumas das SECOES. Os gráficos por filial só existem com todas as filiais
+# e o faturamento por mês só no filtro por ano, como no painel.
+def calcular(cubo, regiao='Todos', filial='Todos', ano='Todos', mes=None, fatia_regiao_filial=None, mensal=None,
+             medicoes=None, secoes=tuple(SECOES)):
+    mes = numero_do_mes(mes)
+    with etapa(medicoes, 'filtro', len(cubo)) as medicao:
+        if fatia_regiao_filial is None:
+            fatia_regiao_filial = fatiar(cubo, regiao, filial)
+        fatia = fatiar(fatia_regiao_filial, ano=ano, mes=mes)
+        medicao['linhas_saida'] = len(fatia)
+
+    resultado = {'filtro': {'regiao': regiao, 'filial': filial, 'ano': ano, 'mes': mes}, 'secoes': tuple(secoes)}
+    if 'indicadores' in secoes:
+        with etapa(medicoes, 'indicadores', len(fatia)):
+            resultado['indicadores'] = indicadores(fatia, filial)
+    if 'operacao' in secoes:
+        with etapa(medicoes, 'agregacoes_graficos', len(fatia)):
+            resultado['tipos_operacao'] = tipos_operacao(fatia)
+            resultado['pontualidade'] = pontualidade(fatia)
+    if 'filiais' in secoes and filial == 'Todos':
+        with etapa(medicoes, 'agregacoes_filiais', len(fatia)):
+            resultado['faturamento_por_filial'] = faturamento_por_filial(fatia)
+            resultado['atrasos_por_filial'] = atrasos_por_filial(fatia)
+    if 'faturamento_mes' in secoes and mes is None:
+        with etapa(medicoes, 'faturamento_mensal', len(fatia_regiao_filial)) as medicao:
+            if mensal is None:
+                mensal = faturamento_mensal_por_filial(fatia_regiao_filial)
+            anos = anos_disponiveis(cubo) if ano == 'Todos' else [ano]
+            resultado['faturamento_por_mes'] = faturamento_por_mes(mensal, anos)
+            medicao['linhas_saida'] = len(resultado['faturamento_por_mes'])
+    return resultado
+
+
+def filtro_normalizado(regiao='Todos', filial='Todos', ano='Todos', mes=None):
+    # Mesma chave para filtros equivalentes ('Março' e 3, numpy.int64 e int)
+    ano = ano if ano == 'Todos' else int(ano)
+    return regiao, filial, ano, numero_do_mes(mes)
+
+
+def periodo_do_filtro(ano='Todos', mes=None):
+    # Início e fim (exclusivo) das datas do período, ou None para todos os anos
+    if ano == 'Todos':
+        return None
+    if mes is None:
+        return pd.Timestamp(int(ano), 1, 1), pd.Timestamp(int(ano) + 1, 1, 1)
+    inicio = pd.Timestamp(int(ano), int(mes), 1)
+    return inicio, inicio + pd.DateOffset(months=1)
+
+
+def filtro_da_secao(secao, regiao='Todos', filial='Todos', ano='Todos', mes=None):
+    # Filtro normalizado só com os filtros de que a seção depende
+    filtro = dict(zip(FILTRO_PADRAO, filtro_normalizado(regiao, filial, ano, mes)))
+    return tuple(filtro[nome] if nome in SECOES[secao] else padrao for nome, padrao in FILTRO_PADRAO.items())
+
+
+def filtro_e_secoes(secao, regiao='Todos', filial='Todos', ano='Todos', mes=None):
+    # Filtro e seções a calcular: todas, ou só `secao` com os seus filtros
+    if secao is None:
+        return filtro_normalizado(regiao, filial, ano, mes), tuple(SECOES)
+    return filtro_da_secao(secao, regiao, filial, ano, mes), (secao,)
+
+
+# Igual a `calcular`, reaproveitando o resultado de um filtro já calculado
+# enquanto `versao` (ver `versao_dados`) não muda. Com `secao`, calcula só
+# essa seção e a guarda pelos filtros de que ela depende. Os resultados em
+# cache são compartilhados e não devem ser alterados por quem os recebe.
+def calcular_em_cache(cubo, versao, regiao='Todos', filial='Todos', ano='Todos', mes=None, medicoes=None, secao=None):
+    filtro, secoes = filtro_e_secoes(secao, regiao, filial, ano, mes)
+    return _cache.obter((secao,) + filtro, lambda: calcular(cubo, *filtro, medicoes=medicoes, secoes=secoes), versao)
+
+
+def estatisticas_cache():
+    return _cache.estatisticas()
+
+
+def limpar_cache():
+    _cache.limpar()
+
+
+# Consultas do painel sobre o cubo em memória. `consulta_sql.MotorSQL` tem a
+# mesma interface e responde às mesmas perguntas em SQL sobre o snapshot.
+class MotorCubo:
+    def __init__(self, cubo, particoes):
+        self.cubo = cubo
+        self.particoes = particoes
+        self.versao = versao_dados(particoes)
+
+    def vazio(self):
+        return self.cubo is None
+
+    def anos(self):
+        return anos_disponiveis(self.cubo)
+
+    def regioes(self):
+        return regioes_disponiveis(self.cubo)
+
+    def filiais(self, regiao='Todos'):
+        return filiais_disponiveis(self.cubo, regiao)
+
+    def calcular(self, regiao='Todos', filial='Todos', ano='Todos', mes=None, medicoes=None, secao=None):
+        return calcular_em_cache(self.cubo, self.versao, regiao, filial, ano, mes, medicoes, secao)
+
+    def estatisticas_cache(self):
+        return estatisticas_cache()
+
+    def resumo(self):
+        # Memória ocupada pelos dados carregados e pelo cubo
+        memoria_dados = sum(memoria_mb(df) for _, df in self.particoes)
+        return f'Memória: {memoria_dados:,.1f} MB em dados e {memoria_mb(self.cubo):,.1f} MB no cubo'
+
+
+# Atualiza o snapshot e devolve o motor de consultas escolhido em SIL_MOTOR,
+# junto com os erros de conversão. O motor 'duckdb' não carrega os meses nem
+# monta o cubo: as consultas vão direto ao snapshot.
+def abrir_motor(padrao_arquivos, pasta_snapshot, motor=MOTOR_CONSULTA, medicoes=None):
+    if motor == 'duckdb':
+        from sil_login.consulta_sql import MotorSQL
+
+        with etapa(medicoes, 'snapshot'):
+            erros = atualizar_snapshot(padrao_arquivos, pasta_snapshot)
+        return MotorSQL(pasta_snapshot), erros
+    if motor != 'pandas':
+        raise ValueError(f"SIL_MOTOR deve ser 'pandas' ou 'duckdb', não {motor!r}")
+    cubo, particoes, erros = carregar(padrao_arquivos, pasta_snapshot, medicoes)
+    return MotorCubo(cubo, particoes), erros
+
+
+# Percorre todas as combinações de filtro oferecidas no painel. A fatia de cada
+# (região, filial) e o seu faturamento mensal são calculados uma única vez e
+# reaproveitados por todos os períodos da combinação.
+def calcular_todos(cubo):
+    anos = anos_disponiveis(cubo)
+    periodos = [('Todos', None)] + [(ano, None) for ano in anos]
+    periodos += [(ano, mes) for ano in anos for mes in range(1, 13)]
+
+    for regiao in ['Todos'] + regioes_disponiveis(cubo):
+        for filial in ['Todos'] + [f for f in filiais_disponiveis(cubo, regiao) if pd.notna(f)]:
+            fatia_regiao_filial = fatiar(cubo, regiao, filial)
+            mensal = faturamento_mensal_por_filial(fatia_regiao_filial)
+            for ano, mes in periodos:
+                yield calcular(cubo, regiao, filial, ano, mes, fatia_regiao_filial, mensal)
@@ -0,0 +1,119 @@
+import argparse
+import http.server
+import json
+import os
+import re
+import sys
+import urllib.parse
+
+# Servidor HTTP que imita as duas chamadas da API REST do SharePoint usadas na
+# sincronização (listar a pasta e baixar um arquivo, com Range e If-Range),
+# servindo os arquivos de uma pasta local. Serve para testar a sincronização
+# sem acesso ao SharePoint.
+
+LISTAR = re.compile(r"^/_api/web/GetFolderByServerRelativeUrl\('(.*)'\)/Files$")
+BAIXAR = re.compile(r"^/_api/web/GetFileByServerRelativeUrl\('(.*)'\)/\$value$")
+
+
+def etag(caminho):
+    # Muda sempre que o arquivo é alterado, como a ETag do SharePoint
+    estado = os.stat(caminho)
+    return f'"{estado.st_mtime_ns:x}-{estado.st_size:x}"'
+
+
+def criar_handler(pasta, prefixo):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def _caminho_local(self, caminho_servidor):
+            # '/<prefixo>/2024-3.csv' -> '<pasta>/2024-3.csv'
+            relativo = caminho_servidor.replace("''", "'")[len(prefixo):].lstrip('/')
+            caminho = os.path.normpath(os.path.join(pasta, relativo))
+            if os.path.commonpath([caminho, pasta]) != pasta:
+                return None
+            return caminho
+
+        def do_GET(self):
+            caminho = urllib.parse.unquote(urllib.parse.urlsplit(self.path).path)
+            if encontrado := LISTAR.match(caminho):
+                self.listar(encontrado.group(1))
+            elif encontrado := BAIXAR.match(caminho):
+                self.baixar(encontrado.group(1))
+            else:
+                self.send_error(404)
+
+        def listar(self, caminho_servidor):
+            local = self._caminho_local(caminho_servidor)
+            if local is None or not os.path.isdir(local):
+                self.send_error(404)
+                return
+            arquivos = [
+                {
+                    'Name': nome,
+                    'Length': str(os.path.getsize(os.path.join(local, nome))),
+                    'ETag': etag(os.path.join(local, nome)),
+                    'ServerRelativeUrl': f"{caminho_servidor.rstrip('/')}/{nome}",
+                }
+                for nome in sorted(os.listdir(local)) if os.path.isfile(os.path.join(local, nome))
+            ]
+            corpo = json.dumps({'value': arquivos}, ensure_ascii=False).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json;odata=nometadata')
+            self.send_header('Content-Length', str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def baixar(self, caminho_servidor):
+            local = self._caminho_local(caminho_servidor)
+            if local is None or not os.path.isfile(local):
+                self.send_error(404)
+                return
+            tamanho = os.path.getsize(local)
+            marca = etag(local)
+            inicio = 0
+            faixa = re.match(r'^bytes=(\d+)-$', self.headers.get('Range', ''))
+            if faixa and self.headers.get('If-Range', marca) == marca:
+                inicio = int(faixa.group(1))
+                if inicio >= tamanho:
+                    self.send_error(416)
+                    return
+
+            self.send_response(206 if inicio else 200)
+            self.send_header('Content-Type', 'application/octet-stream')
+            self.send_header('Content-Length', str(tamanho - inicio))
+            self.send_header('ETag', marca)
+            if inicio:
+                self.send_header('Content-Range', f'bytes {inicio}-{tamanho - 1}/{tamanho}')
+            self.end_headers()
+            with open(local, 'rb') as arquivo:
+                arquivo.seek(inicio)
+                while bloco := arquivo.read(64 * 1024):
+                    self.wfile.write(bloco)
+
+    return Handler
+
+
+# Serve `pasta` como se fosse a pasta `prefixo` de uma biblioteca do SharePoint
+def criar_servidor(pasta, prefixo='/SIL Log-In', porta=8765, endereco='127.0.0.1'):
+    return http.server.ThreadingHTTPServer((endereco, porta), criar_handler(os.path.abspath(pasta), prefixo))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m sil_login.sharepoint_local',
+        description='Serve uma pasta local imitando a API REST do SharePoint usada na sincronização.',
+    )
+    parser.add_argument('pasta', help='pasta com os CSVs')
+    parser.add_argument('--prefixo', default='/SIL Log-In', help='caminho da pasta na biblioteca simulada')
+    parser.add_argument('--porta', type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    servidor = criar_servidor(args.pasta, args.prefixo, args.porta)
+    print(f'Servindo {args.pasta} em http://127.0.0.1:{args.porta} (pasta {args.prefixo})')
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,292 @@
+import argparse
+import concurrent.futures
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+try:
+    from office365.runtime.auth.authentication_context import AuthenticationContext
+    from office365.runtime.http.request_options import RequestOptions
+except ImportError:
+    AuthenticationContext = None
+
+from sil_login.arquivos import substituir, travar
+from sil_login.configuracao import PASTA_CACHE, SHAREPOINT_PASTA, SHAREPOINT_SITE
+
+logger = logging.getLogger('sil_login.sincronizacao')
+
+ARQUIVO_MANIFESTO = 'sincronizacao.json'
+ARQUIVO_TRAVA = '.sincronizacao.lock'
+SUFIXO_PARCIAL = '.parcial'
+TAMANHO_BLOCO = 1024 * 1024
+TIMEOUT = 30
+
+# Intervalo mínimo entre duas sincronizações em segundo plano, em segundos
+INTERVALO_MINIMO = 300
+
+
+def _normalizar_etag(etag):
+    # Ignorar a marca de ETag fraca (W/) ao comparar
+    if etag is None:
+        return None
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def _literal(caminho):
+    # Caminho dentro de ('...') na URL da API REST
+    return urllib.parse.quote(caminho.replace("'", "''"))
+
+
+# Acesso à pasta de exportações pela API REST do SharePoint. Sem `autenticacao`
+# as requisições vão sem credenciais, o que permite apontar para um servidor
+# local (python -m sil_login.sharepoint_local).
+class Biblioteca:
+    def __init__(self, site, pasta, autenticacao=None):
+        self.site = site.rstrip('/')
+        self.pasta = pasta
+        self.autenticacao = autenticacao
+
+    def _requisicao(self, url, cabecalhos):
+        if self.autenticacao is not None:
+            opcoes = RequestOptions(url)
+            self.autenticacao.authenticate_request(opcoes)
+            cabecalhos = {**opcoes.headers, **cabecalhos}
+        return urllib.request.Request(url, headers=cabecalhos)
+
+    def listar(self):
+        # Arquivos da pasta com nome, tamanho e ETag
+        url = f"{self.site}/_api/web/GetFolderByServerRelativeUrl('{_literal(self.pasta)}')/Files"
+        requisicao = self._requisicao(url, {'Accept': 'application/json;odata=nometadata'})
+        with urllib.request.urlopen(requisicao, timeout=TIMEOUT) as resposta:
+            arquivos = json.load(resposta)['value']
+        return [
+            {'nome': arquivo['Name'], 'tamanho': int(arquivo['Length']),
+             'etag': _normalizar_etag(arquivo['ETag']), 'url': arquivo['ServerRelativeUrl']}
+            for arquivo in arquivos
+        ]
+
+    def abrir(self, arquivo, inicio=0):
+        # Conteúdo do arquivo a partir do byte `inicio`. O If-Range faz o
+        # servidor mandar o arquivo inteiro se ele mudou desde a listagem.
+        url = f"{self.site}/_api/web/GetFileByServerRelativeUrl('{_literal(arquivo['url'])}')/$value"
+        cabecalhos = {}
+        if inicio:
+            cabecalhos = {'Range': f'bytes={inicio}-', 'If-Range': arquivo['etag']}
+        return urllib.request.urlopen(self._requisicao(url, cabecalhos), timeout=TIMEOUT)
+
+
+def autenticar(site):
+    # Credenciais de usuário (SIL_SHAREPOINT_USUARIO e SIL_SHAREPOINT_SENHA) ou
+    # de aplicativo (SIL_SHAREPOINT_CLIENT_ID e SIL_SHAREPOINT_CLIENT_SECRET)
+    usuario = os.environ.get('SIL_SHAREPOINT_USUARIO')
+    client_id = os.environ.get('SIL_SHAREPOINT_CLIENT_ID')
+    if not usuario and not client_id:
+        return None
+    if AuthenticationContext is None:
+        raise RuntimeError('Instale o pacote office365 para autenticar no SharePoint')
+    autenticacao = AuthenticationContext(site)
+    if usuario:
+        autenticacao.acquire_token_for_user(usuario, os.environ.get('SIL_SHAREPOINT_SENHA', ''))
+    else:
+        autenticacao.acquire_token_for_app(client_id, os.environ.get('SIL_SHAREPOINT_CLIENT_SECRET', ''))
+    return autenticacao
+
+
+def ler_manifesto(pasta_cache):
+    try:
+        with open(os.path.join(pasta_cache, ARQUIVO_MANIFESTO), encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def gravar_manifesto(pasta_cache, manifesto):
+    def gravar(caminho):
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            json.dump(manifesto, arquivo, indent=1, ensure_ascii=False)
+
+    substituir(os.path.join(pasta_cache, ARQUIVO_MANIFESTO), gravar)
+
+
+def cache_pronto(pasta_cache):
+    # Já existe ao menos um arquivo sincronizado para o painel ler
+    manifesto = ler_manifesto(pasta_cache)
+    return any(os.path.exists(os.path.join(pasta_cache, nome)) for nome in manifesto)
+
+
+def atualizado(pasta_cache, manifesto, arquivo):
+    # O arquivo local é a mesma versão do arquivo da biblioteca
+    registro = manifesto.get(arquivo['nome'])
+    caminho = os.path.join(pasta_cache, arquivo['nome'])
+    return (
+        registro is not None
+        and registro['etag'] == arquivo['etag']
+        and registro['tamanho'] == arquivo['tamanho']
+        and os.path.exists(caminho)
+        and os.path.getsize(caminho) == arquivo['tamanho']
+    )
+
+
+# Baixa um arquivo para a pasta do cache. O download é feito em
+# '<nome>.parcial', com a ETag da versão em '<nome>.parcial.etag'; se for
+# interrompido, a próxima sincronização continua de onde parou enquanto a ETag
+# for a mesma. O arquivo só substitui o anterior depois de conferidos o
+# tamanho e a ETag.
+def baixar(biblioteca, arquivo, pasta_cache):
+    destino = os.path.join(pasta_cache, arquivo['nome'])
+    parcial = destino + SUFIXO_PARCIAL
+    marca = parcial + '.etag'
+
+    inicio = 0
+    try:
+        with open(marca, encoding='utf-8') as entrada:
+            if entrada.read() == arquivo['etag']:
+                inicio = os.path.getsize(parcial)
+    except OSError:
+        pass
+    if inicio > arquivo['tamanho']:
+        inicio = 0
+    if inicio == 0:
+        with open(marca, 'w', encoding='utf-8') as saida:
+            saida.write(arquivo['etag'])
+        open(parcial, 'wb').close()
+
+    if inicio < arquivo['tamanho']:
+        with biblioteca.abrir(arquivo, inicio) as resposta:
+            etag = _normalizar_etag(resposta.headers.get('ETag'))
+            if etag is not None and etag != arquivo['etag']:
+                raise ValueError('o arquivo mudou desde a listagem')
+            if resposta.status != 206:
+                # O servidor mandou o arquivo inteiro
+                inicio = 0
+            with open(parcial, 'ab' if inicio else 'wb') as saida:
+                while bloco := resposta.read(TAMANHO_BLOCO):
+                    saida.write(bloco)
+
+    tamanho = os.path.getsize(parcial)
+    if tamanho != arquivo['tamanho']:
+        raise ValueError(f"tamanho baixado ({tamanho}) diferente do esperado ({arquivo['tamanho']})")
+    os.replace(parcial, destino)
+    os.remove(marca)
+    return destino
+
+
+# Traz para `pasta_cache` os CSVs novos ou alterados da biblioteca, vários ao
+# mesmo tempo, e remove os que saíram dela. Retorna os arquivos baixados e os
+# erros como (arquivo, exceção). Sincronizações simultâneas da mesma pasta,
+# de threads ou de processos, são feitas uma de cada vez.
+def sincronizar(biblioteca, pasta_cache, max_workers=4):
+    os.makedirs(pasta_cache, exist_ok=True)
+    with travar(os.path.join(pasta_cache, ARQUIVO_TRAVA)):
+        return _sincronizar(biblioteca, pasta_cache, max_workers)
+
+
+def _sincronizar(biblioteca, pasta_cache, max_workers=4):
+    manifesto = ler_manifesto(pasta_cache)
+    arquivos = [arquivo for arquivo in biblioteca.listar() if arquivo['nome'].lower().endswith('.csv')]
+
+    nomes = {arquivo['nome'] for arquivo in arquivos}
+    for nome in [nome for nome in manifesto if nome not in nomes]:
+        caminho = os.path.join(pasta_cache, nome)
+        if os.path.exists(caminho):
+            os.remove(caminho)
+        del manifesto[nome]
+
+    pendentes = [arquivo for arquivo in arquivos if not atualizado(pasta_cache, manifesto, arquivo)]
+    baixados, erros = [], []
+    lock = threading.Lock()
+
+    def baixar_e_registrar(arquivo):
+        destino = baixar(biblioteca, arquivo, pasta_cache)
+        # Registrar cada arquivo assim que termina, para não baixá-lo de novo
+        # se a sincronização for interrompida
+        with lock:
+            manifesto[arquivo['nome']] = {'etag': arquivo['etag'], 'tamanho': arquivo['tamanho']}
+            gravar_manifesto(pasta_cache, manifesto)
+        return destino
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futuros = {executor.submit(baixar_e_registrar, arquivo): arquivo for arquivo in pendentes}
+        for futuro in concurrent.futures.as_completed(futuros):
+            try:
+                baixados.append(futuro.result())
+            except Exception as e:
+                erros.append((futuros[futuro]['nome'], e))
+
+    gravar_manifesto(pasta_cache, manifesto)
+    return sorted(baixados), erros
+
+
+def biblioteca_configurada(site=SHAREPOINT_SITE, pasta=SHAREPOINT_PASTA):
+    return Biblioteca(site, pasta, autenticar(site))
+
+
+# Estado da sincronização em segundo plano, compartilhado entre as sessões
+_estado = {'thread': None, 'inicio': None, 'fim': None, 'baixados': [], 'erros': []}
+_estado_lock = threading.Lock()
+
+
+def _sincronizar_registrando(pasta_cache, site, pasta):
+    try:
+        baixados, erros = sincronizar(biblioteca_configurada(site, pasta), pasta_cache)
+    except Exception as e:
+        baixados, erros = [], [(site, e)]
+    for nome, erro in erros:
+        logger.warning('Falha ao sincronizar %s: %s', nome, erro)
+    with _estado_lock:
+        _estado.update({'fim': time.time(), 'baixados': baixados, 'erros': erros, 'thread': None})
+
+
+# Garante que o cache local tenha os CSVs da biblioteca. Com o cache já
+# preenchido a sincronização roda em segundo plano, no máximo uma vez a cada
+# `intervalo` segundos, e o painel segue com os arquivos que já tem; os meses
+# baixados aparecem na execução seguinte. Só a primeira carga, com o cache
+# vazio, espera pela rede. Retorna uma cópia do estado da última sincronização.
+def preparar_cache(pasta_cache=PASTA_CACHE, site=SHAREPOINT_SITE, pasta=SHAREPOINT_PASTA, intervalo=INTERVALO_MINIMO):
+    pronto = cache_pronto(pasta_cache)
+    with _estado_lock:
+        ocioso = _estado['thread'] is None
+        devida = not pronto or _estado['inicio'] is None or time.time() - _estado['inicio'] >= intervalo
+        if ocioso and devida:
+            _estado['inicio'] = time.time()
+            thread = threading.Thread(
+                target=_sincronizar_registrando, args=(pasta_cache, site, pasta),
+                name='sil-sincronizacao', daemon=True,
+            )
+            _estado['thread'] = thread
+            thread.start()
+        thread = _estado['thread']
+
+    if thread is not None and not pronto:
+        thread.join()
+    with _estado_lock:
+        return {chave: valor for chave, valor in _estado.items() if chave != 'thread'}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m sil_login.sincronizacao',
+        description='Sincroniza os CSVs da biblioteca do SharePoint com a pasta local.',
+    )
+    parser.add_argument('--site', default=SHAREPOINT_SITE, help='URL do site (padrão: SIL_SHAREPOINT_SITE)')
+    parser.add_argument('--pasta', default=SHAREPOINT_PASTA, help='pasta da biblioteca (padrão: SIL_SHAREPOINT_PASTA)')
+    parser.add_argument('--cache', default=PASTA_CACHE, help='pasta local (padrão: SIL_CACHE)')
+    parser.add_argument('--max-workers', type=int, default=4)
+    args = parser.parse_args(argv)
+    if not args.site or not args.pasta:
+        parser.error('informe --site e --pasta ou as variáveis SIL_SHAREPOINT_SITE e SIL_SHAREPOINT_PASTA')
+
+    baixados, erros = sincronizar(biblioteca_configurada(args.site, args.pasta), args.cache, args.max_workers)
+    for nome, erro in erros:
+        print(f'Erro ao baixar {nome}: {erro}', file=sys.stderr)
+    print(f'{len(baixados)} arquivos baixados para {args.cache}')
+    return 1 if erros else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
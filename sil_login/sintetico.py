@@ -0,0 +1,150 @@
+import argparse
+import calendar
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from sil_login.configuracao import FORMATO_DATA
+
+# Cabeçalho dos arquivos exportados pelo SIL (layout de 2023)
+COLUNAS = [
+    'Numero de Tratativas', 'Número da programação', 'Aut. embarque', 'Tipo de programação',
+    'Situação programação', 'CNPJ Transportadora', 'Transportadora', 'Nome local de atendimento',
+    'Situação prazo programação', 'Previsão início atendimento (BRA)', 'Situação viagem',
+    'Dt. inclusão da programação', 'Cidade de destino', 'Dt chegada local de atendimento (BRA)',
+    'Dt saída local de atendimento (BRA)', 'Cidade de origem', 'Cidade local de atendimento',
+    'Placa do veículo', 'Placa da carreta 1', 'Embarcador', 'Placa da carreta 2', 'Valor da viagem',
+    'Data de criação da AE', 'Observação Aberta', 'Última tratativa',
+]
+
+# Distribuições aproximadas das exportações reais de 2023 e 2024
+PESOS_CNPJ = {
+    '15.245.792/0005-65': 0.343,
+    '15.245.792/0004-84': 0.314,
+    '15.245.792/0006-46': 0.286,
+    '15.245.792/0001-31': 0.055,
+    '15.245.792/0003-01': 0.0012,
+    '15.245.792/0007-27': 0.0008,
+}
+SIGLAS_CNPJ = {
+    '15.245.792/0005-65': 'REC',
+    '15.245.792/0004-84': 'SSA',
+    '15.245.792/0006-46': 'SSZ',
+    '15.245.792/0001-31': 'ITJ',
+    '15.245.792/0003-01': 'CWB',
+    '15.245.792/0007-27': 'CXJ',
+}
+CIDADES_CNPJ = {
+    '15.245.792/0005-65': ('IPOJUCA/PE', 'ALHANDRA/PB'),
+    '15.245.792/0004-84': ('SALVADOR/BA', 'MARANGUAPE/CE'),
+    '15.245.792/0006-46': ('SANTOS/SP', 'GUARULHOS/SP'),
+    '15.245.792/0001-31': ('ITAJAI/SC', 'JOINVILLE/SC'),
+    '15.245.792/0003-01': ('PARANAGUA/PR', 'CURITIBA/PR'),
+    '15.245.792/0007-27': ('RIO GRANDE/RS', 'CAXIAS DO SUL/RS'),
+}
+SITUACOES = {
+    'ENCERRADA': 0.834, 'CANCELADA': 0.136, 'CANCELADA COM AE': 0.020, 'NOVA': 0.0056,
+    'EM VIAGEM': 0.0032, 'AGENDADA': 0.0015, 'PENDENTE': 0.0007,
+}
+TIPOS = {'Entrega': 0.624, 'Coleta': 0.366, 'Transporte Rodoviario': 0.004, None: 0.006}
+VALORES = {'1,00': 0.90, '2,00': 0.093, '100.000,00': 0.004, '150.001,00': 0.003}
+PROPORCAO_ATRASADO = 0.106
+PROPORCAO_DUPLICADA = 0.0005
+
+
+def _sortear(gerador, pesos, tamanho):
+    valores = list(pesos)
+    probabilidades = np.array(list(pesos.values()), dtype=float)
+    indices = gerador.choice(len(valores), size=tamanho, p=probabilidades / probabilidades.sum())
+    return np.array(valores, dtype=object)[indices]
+
+
+# Gera as linhas de um mês no layout da exportação do SIL. `inicio_numeracao`
+# mantém os números de programação únicos entre os meses.
+def gerar_mes(gerador, ano, mes, linhas, inicio_numeracao=0):
+    cnpj = _sortear(gerador, PESOS_CNPJ, linhas)
+    situacao = _sortear(gerador, SITUACOES, linhas)
+    cancelada = situacao == 'CANCELADA'
+    atrasado = gerador.random(linhas) < PROPORCAO_ATRASADO
+    prazo = np.where(cancelada, None, np.where(atrasado, 'Atrasado', 'No prazo'))
+
+    # Previsão de início em um dia e hora cheia qualquer do mês
+    dias = calendar.monthrange(ano, mes)[1]
+    previsao = (
+        pd.Timestamp(ano, mes, 1)
+        + pd.to_timedelta(gerador.integers(0, dias, linhas), unit='D')
+        + pd.to_timedelta(gerador.integers(5, 19, linhas), unit='h')
+    )
+    inclusao = previsao - pd.to_timedelta(gerador.integers(3600, 5 * 86400, linhas), unit='s')
+
+    # Números de programação no formato '3REC72706A', com algumas linhas repetidas
+    siglas = pd.Series(cnpj).map(SIGLAS_CNPJ).to_numpy(dtype=str)
+    sequencia = np.arange(inicio_numeracao, inicio_numeracao + linhas) + 100000
+    numero = np.char.add(np.char.add(np.char.add(str(ano % 10), siglas), sequencia.astype(str)), 'A')
+    duplicadas = np.flatnonzero(gerador.random(linhas) < PROPORCAO_DUPLICADA)
+    numero[duplicadas[duplicadas > 0]] = numero[duplicadas[duplicadas > 0] - 1]
+
+    cidades = pd.Series(cnpj).map(CIDADES_CNPJ)
+    data = pd.DataFrame({coluna: pd.Series([None] * linhas, dtype=object) for coluna in COLUNAS})
+    data['Numero de Tratativas'] = 0
+    data['Número da programação'] = numero
+    data['Aut. embarque'] = np.where(cancelada, None, gerador.integers(700000, 999999, linhas).astype(str))
+    data['Tipo de programação'] = _sortear(gerador, TIPOS, linhas)
+    data['Situação programação'] = situacao
+    data['CNPJ Transportadora'] = cnpj
+    data['Transportadora'] = 'SAFFLOG TRANSPORTES E LOGISTICA INTEGRAD'
+    data['Nome local de atendimento'] = 'CLIENTE ' + pd.Series(siglas)
+    data['Situação prazo programação'] = prazo
+    data['Previsão início atendimento (BRA)'] = previsao.strftime(FORMATO_DATA)
+    data['Situação viagem'] = np.where(cancelada, 'SEM VIAGEM', 'CONCLUIDA')
+    data['Dt. inclusão da programação'] = inclusao.strftime(FORMATO_DATA)
+    data['Cidade de origem'] = cidades.str[0]
+    data['Cidade local de atendimento'] = cidades.str[1]
+    data['Embarcador'] = 'ATUALIZAR PARA O EMBARCADOR CORRETO'
+    data['Valor da viagem'] = _sortear(gerador, VALORES, linhas)
+    data['Observação Aberta'] = '...'
+    return data
+
+
+# Grava `linhas` linhas distribuídas em arquivos AAAA-M.csv, um por mês a
+# partir de `ano_inicial`, no mesmo formato (';' e latin1) das exportações.
+# Retorna a lista de arquivos gravados.
+def gerar_exportacoes(pasta, linhas, meses=24, ano_inicial=2023, semente=0):
+    os.makedirs(pasta, exist_ok=True)
+    gerador = np.random.default_rng(semente)
+    por_mes = np.full(meses, linhas // meses)
+    por_mes[:linhas % meses] += 1
+
+    arquivos = []
+    inicio_numeracao = 0
+    for indice, linhas_mes in enumerate(por_mes):
+        ano, mes = ano_inicial + indice // 12, indice % 12 + 1
+        data = gerar_mes(gerador, ano, mes, int(linhas_mes), inicio_numeracao)
+        inicio_numeracao += int(linhas_mes)
+        caminho = os.path.join(pasta, f'{ano}-{mes}.csv')
+        data.to_csv(caminho, sep=';', index=False, encoding='latin1')
+        arquivos.append(caminho)
+    return arquivos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m sil_login.sintetico',
+        description='Gera exportações mensais sintéticas no formato do SIL.',
+    )
+    parser.add_argument('pasta', help='pasta onde os CSVs serão gravados')
+    parser.add_argument('--linhas', type=int, default=100_000, help='total de linhas (ex.: 100000, 1000000, 10000000)')
+    parser.add_argument('--meses', type=int, default=24)
+    parser.add_argument('--ano-inicial', type=int, default=2023)
+    parser.add_argument('--semente', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    arquivos = gerar_exportacoes(args.pasta, args.linhas, args.meses, args.ano_inicial, args.semente)
+    print(f'{len(arquivos)} arquivos gravados em {args.pasta}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
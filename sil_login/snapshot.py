@@ -0,0 +1,273 @@
+import concurrent.futures
+import glob
+import json
+import os
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc
+
+from sil_login.arquivos import substituir, travar
+from sil_login.carregamento import assinatura_arquivo, ler_csv
+from sil_login.configuracao import COLUNA_DATA
+from sil_login.tratamento import concatenar, tratar_dados
+
+# Nome dos arquivos exportados pelo SIL: AAAA-M.csv
+PADRAO_NOME = re.compile(r'^(\d{4})-(\d{1,2})\.csv$', re.IGNORECASE)
+
+ARQUIVO_MANIFESTO = 'manifesto.json'
+ARQUIVO_PARTICAO = 'dados.parquet'
+ARQUIVO_TRAVA = '.atualizacao.lock'
+
+# Versão do formato das partições; mudar força a reconversão de todos os meses
+VERSAO_SNAPSHOT = 5
+
+# Cache das partições já lidas: (caminho, colunas) -> (mtime, tamanho, DataFrame)
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def particao_do_arquivo(caminho):
+    # Extrair (ano, mês) do nome do arquivo exportado
+    encontrado = PADRAO_NOME.match(os.path.basename(caminho))
+    if encontrado is None:
+        raise ValueError(f'Nome fora do padrão AAAA-M.csv: {caminho}')
+    return int(encontrado.group(1)), int(encontrado.group(2))
+
+
+def caminho_particao(pasta_snapshot, ano, mes):
+    return os.path.join(pasta_snapshot, f'ano={ano}', f'mes={mes}', ARQUIVO_PARTICAO)
+
+
+# Cópia da partição em Arrow IPC sem compressão, lida mapeando o arquivo em
+# memória. A assinatura do CSV de origem vai no nome para que uma versão nova
+# nunca sobrescreva um arquivo que ainda esteja mapeado.
+def caminho_mapeavel(pasta_snapshot, entrada):
+    nome = f"dados-{entrada['mtime']}-{entrada['tamanho']}.arrow"
+    return os.path.join(pasta_snapshot, f"ano={entrada['ano']}", f"mes={entrada['mes']}", nome)
+
+
+def _remover_mapeaveis(pasta_particao, manter=None):
+    # Apagar as cópias Arrow antigas. No Windows um arquivo ainda mapeado não
+    # pode ser apagado; ele fica para a próxima conversão do mês.
+    for caminho in glob.glob(os.path.join(pasta_particao, 'dados-*.arrow')):
+        if caminho != manter:
+            try:
+                os.remove(caminho)
+            except OSError:
+                pass
+
+
+def ler_manifesto(pasta_snapshot):
+    try:
+        with open(os.path.join(pasta_snapshot, ARQUIVO_MANIFESTO), encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def gravar_manifesto(pasta_snapshot, manifesto):
+    def gravar(caminho):
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            json.dump(manifesto, arquivo, indent=1, ensure_ascii=False)
+
+    substituir(os.path.join(pasta_snapshot, ARQUIVO_MANIFESTO), gravar)
+
+
+def _data_iso(data):
+    return None if pd.isna(data) else data.isoformat()
+
+
+# Converte um CSV mensal em uma partição Parquet já tipada e, com
+# `destino_mapeavel`, também na cópia Arrow lida pelo painel. As linhas são
+# gravadas em ordem de data, com as datas vazias no fim, para que um período
+# seja achado por busca binária (ver `limites_periodo`). Retorna a primeira e
+# a última data da partição, guardadas no manifesto.
+def converter_arquivo(caminho, destino, destino_mapeavel=None):
+    _, df = ler_csv(caminho)
+    df = tratar_dados(df)
+    df = df.sort_values(COLUNA_DATA, kind='stable', na_position='last', ignore_index=True)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    substituir(destino, lambda temporario: df.to_parquet(temporario, index=False))
+    if destino_mapeavel is not None:
+        tabela = pa.Table.from_pandas(df, preserve_index=False)
+
+        def gravar_mapeavel(temporario):
+            with pa.OSFile(temporario, 'wb') as arquivo:
+                with pa.ipc.new_file(arquivo, tabela.schema) as escritor:
+                    escritor.write_table(tabela)
+
+        substituir(destino_mapeavel, gravar_mapeavel)
+        _remover_mapeaveis(os.path.dirname(destino), manter=destino_mapeavel)
+    return {'data_inicio': _data_iso(df[COLUNA_DATA].min()), 'data_fim': _data_iso(df[COLUNA_DATA].max())}
+
+
+# Converte incrementalmente os CSVs que casam com `padrao` em partições
+# ano=AAAA/mes=M dentro de `pasta_snapshot`. Só meses novos ou alterados são
+# convertidos; partições de arquivos removidos são apagadas. Retorna a lista
+# de (caminho, erro) dos arquivos que não puderam ser convertidos. Chamadas
+# simultâneas, de threads ou de processos, são feitas uma de cada vez.
+def atualizar_snapshot(padrao, pasta_snapshot, max_workers=None):
+    os.makedirs(pasta_snapshot, exist_ok=True)
+    with travar(os.path.join(pasta_snapshot, ARQUIVO_TRAVA)):
+        return _atualizar_snapshot(padrao, pasta_snapshot, max_workers)
+
+
+def _atualizar_snapshot(padrao, pasta_snapshot, max_workers=None):
+    manifesto = ler_manifesto(pasta_snapshot)
+    erros = []
+
+    pendentes = {}
+    atuais = {}
+    # Arquivo de cada (ano, mês): '2024-1.csv' e '2024-01.csv' iriam para a
+    # mesma partição, então o segundo é recusado
+    particoes = {}
+    for caminho in sorted(glob.glob(padrao)):
+        nome = os.path.basename(caminho)
+        try:
+            ano, mes = particao_do_arquivo(caminho)
+        except ValueError as e:
+            erros.append((caminho, e))
+            continue
+        if (ano, mes) in particoes:
+            erros.append((caminho, ValueError(f'Mês {mes}/{ano} repetido; já lido de {particoes[ano, mes]}')))
+            continue
+        particoes[ano, mes] = caminho
+        mtime, tamanho = assinatura_arquivo(caminho)
+        entrada = {'ano': ano, 'mes': mes, 'mtime': mtime, 'tamanho': tamanho, 'versao': VERSAO_SNAPSHOT}
+        destino = caminho_particao(pasta_snapshot, ano, mes)
+        destino_mapeavel = caminho_mapeavel(pasta_snapshot, entrada)
+        anterior = manifesto.get(nome, {})
+        if (
+            any(anterior.get(chave) != valor for chave, valor in entrada.items())
+            or not os.path.exists(destino) or not os.path.exists(destino_mapeavel)
+        ):
+            pendentes[nome] = (caminho, destino, destino_mapeavel)
+            atuais[nome] = entrada
+        else:
+            atuais[nome] = anterior
+
+    # Apagar partições cujo arquivo de origem não existe mais
+    removidos = set(manifesto) - set(atuais)
+    for nome in removidos:
+        if (manifesto[nome]['ano'], manifesto[nome]['mes']) in particoes:
+            # A partição continua, lida de outro arquivo do mesmo mês
+            continue
+        destino = caminho_particao(pasta_snapshot, manifesto[nome]['ano'], manifesto[nome]['mes'])
+        if os.path.exists(destino):
+            os.remove(destino)
+        _remover_mapeaveis(os.path.dirname(destino))
+
+    if not pendentes and not removidos:
+        return erros
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futuros = {
+            nome: executor.submit(converter_arquivo, *argumentos)
+            for nome, argumentos in pendentes.items()
+        }
+        for nome, futuro in futuros.items():
+            try:
+                atuais[nome].update(futuro.result())
+            except Exception as e:
+                erros.append((pendentes[nome][0], e))
+                atuais.pop(nome)
+
+    gravar_manifesto(pasta_snapshot, atuais)
+    return erros
+
+
+def _ler_particao(caminho, colunas=None):
+    mtime, tamanho = assinatura_arquivo(caminho)
+    chave_cache = (caminho, tuple(colunas) if colunas is not None else None)
+    with _cache_lock:
+        em_cache = _cache.get(chave_cache)
+    if em_cache is not None and em_cache[:2] == (mtime, tamanho):
+        return (caminho, mtime, tamanho), em_cache[2]
+
+    if caminho.endswith('.arrow'):
+        # As colunas numéricas, de datas e de texto apontam direto para o
+        # arquivo mapeado, sem cópia: a memória é a do cache de arquivos do
+        # sistema, compartilhada entre todos os processos que leem o snapshot
+        tabela = pa.ipc.open_file(pa.memory_map(caminho)).read_all()
+        if colunas is not None:
+            tabela = tabela.select(colunas)
+        df = tabela.to_pandas(split_blocks=True)
+    else:
+        df = pd.read_parquet(caminho, columns=colunas)
+    with _cache_lock:
+        _cache[chave_cache] = (mtime, tamanho, df)
+    return (caminho, mtime, tamanho), df
+
+
+def _caminho_leitura(pasta_snapshot, entrada):
+    # A cópia Arrow quando existe; o Parquet em snapshots antigos
+    mapeavel = caminho_mapeavel(pasta_snapshot, entrada)
+    if os.path.exists(mapeavel):
+        return mapeavel
+    return caminho_particao(pasta_snapshot, entrada['ano'], entrada['mes'])
+
+
+def _no_periodo(entrada, periodo):
+    # A partição tem alguma data em [início, fim)
+    if periodo is None:
+        return True
+    if entrada.get('data_inicio') is None:
+        return False
+    return pd.Timestamp(entrada['data_inicio']) < periodo[1] and pd.Timestamp(entrada['data_fim']) >= periodo[0]
+
+
+def caminhos_particoes(pasta_snapshot, periodo=None):
+    # Arquivo lido de cada partição listada no manifesto; com `periodo`
+    # (início, fim exclusivo), só das partições com alguma data nele
+    manifesto = ler_manifesto(pasta_snapshot)
+    return [
+        _caminho_leitura(pasta_snapshot, entrada)
+        for _, entrada in sorted(manifesto.items()) if _no_periodo(entrada, periodo)
+    ]
+
+
+def limites_periodo(datas, periodo=None):
+    # Posições [início, fim) das linhas com data em `periodo` em uma coluna
+    # de datas do Arrow gravada por `converter_arquivo`, ordenada e com as
+    # datas vazias no fim; sem `periodo`, todas as linhas com data
+    validas = len(datas) - datas.null_count
+    if periodo is None:
+        return 0, validas
+    valores = datas.slice(0, validas).to_numpy()
+    inicio, fim = np.searchsorted(valores, np.array([p.to_datetime64() for p in periodo]).astype(valores.dtype))
+    return int(inicio), int(fim)
+
+
+# Lê as partições listadas no manifesto do snapshot, em paralelo. Retorna uma
+# lista de (chave, DataFrame), onde a chave (caminho, mtime, tamanho) muda
+# sempre que a partição é regravada. Com `colunas`, lê apenas essas colunas.
+# Cada partição é lida uma vez por processo e fica em cache pela chave e pelas
+# colunas; todas as sessões do painel recebem os mesmos DataFrames, que são
+# só para leitura.
+def ler_particoes(pasta_snapshot, colunas=None, max_workers=None):
+    caminhos = caminhos_particoes(pasta_snapshot)
+
+    with _cache_lock:
+        for chave_cache in [chave for chave in _cache if chave[0] not in caminhos]:
+            del _cache[chave_cache]
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda caminho: _ler_particao(caminho, colunas), caminhos))
+
+
+# Lê todas as partições do snapshot em um único DataFrame
+def ler_snapshot(pasta_snapshot, colunas=None, max_workers=None):
+    particoes = ler_particoes(pasta_snapshot, colunas, max_workers)
+    if not particoes:
+        return None
+    return concatenar(df for _, df in particoes)
+
+
+def limpar_cache():
+    # Esquecer as partições já lidas
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,102 @@
+import pandas as pd
+
+from sil_login.configuracao import COLUNA_DATA, FORMATO_DATA, mapeamento_CNPJ, regionais
+
+# Colunas usadas pelo painel; as demais (texto livre, placas, motorista...)
+# ficam só no snapshot
+COLUNAS_PAINEL = [
+    'Número da programação', 'Tipo de programação', 'Situação programação',
+    'CNPJ Transportadora', 'Situação prazo programação', COLUNA_DATA,
+    'Filial', 'Região',
+]
+
+# Colunas com poucos valores distintos, guardadas como categóricas
+COLUNAS_CATEGORICAS = [
+    'CNPJ Transportadora', 'Filial', 'Região', 'Situação programação',
+    'Situação prazo programação', 'Situação viagem', 'Tipo de programação',
+    'Cidade de origem', 'Cidade de destino', 'Cidade local de atendimento',
+]
+
+
+def converter_valor(serie):
+    # Converter valores no formato brasileiro ("100.000,00") para float
+    texto = serie.astype('string').str.strip()
+    texto = texto.str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+    return pd.to_numeric(texto, errors='coerce').astype('float64')
+
+
+# Tipa as colunas de um mês exportado e resolve Filial e Região a partir do
+# CNPJ, deixando o DataFrame pronto para o painel
+def tratar_dados(data):
+    # Converter coluna de data para datetime ('Previsão início atendimento (BRA)')
+    if COLUNA_DATA in data.columns:
+        data[COLUNA_DATA] = pd.to_datetime(data[COLUNA_DATA], format=FORMATO_DATA, errors='coerce')
+
+    # Converter o valor da viagem de texto com vírgula decimal para número
+    if 'Valor da viagem' in data.columns:
+        data['Valor da viagem'] = converter_valor(data['Valor da viagem'])
+
+    # Adicionar as colunas 'Filial' e 'Região' baseadas na coluna 'CNPJ Transportadora'
+    data['Filial'] = data['CNPJ Transportadora'].map(mapeamento_CNPJ)
+    data['Região'] = data['Filial'].map(regionais)
+    return compactar(data)
+
+
+# Colunas que ficam sempre em float64. O tipo de uma coluna não pode depender
+# dos valores de cada mês: meses com tipos diferentes viram texto ao serem
+# unidos em um só arquivo.
+COLUNAS_FLOAT64 = ['Valor da viagem', 'CPF motorista programado']
+
+
+def reduzir_numerico(serie):
+    # Reduzir inteiros ao menor tipo possível e floats para float32 apenas
+    # quando não há perda de precisão
+    if pd.api.types.is_integer_dtype(serie):
+        return pd.to_numeric(serie, downcast='integer')
+    reduzida = serie.astype('float32')
+    if ((reduzida.astype('float64') == serie) | serie.isna()).all():
+        return reduzida
+    return serie
+
+
+# Converte as colunas de poucos valores distintos em categóricas e reduz as
+# colunas numéricas, sem copiar o DataFrame inteiro
+def compactar(data):
+    for coluna in data.columns:
+        serie = data[coluna]
+        if coluna in COLUNAS_CATEGORICAS:
+            if not isinstance(serie.dtype, pd.CategoricalDtype):
+                data[coluna] = serie.astype('category')
+        elif pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+            if coluna in COLUNAS_FLOAT64:
+                data[coluna] = serie.astype('float64')
+            else:
+                data[coluna] = reduzir_numerico(serie)
+    return data
+
+
+# Concatena meses compactados unindo as categorias de cada coluna, para que as
+# categóricas não voltem a ser texto no DataFrame final
+def concatenar(data_frames):
+    data_frames = list(data_frames)
+    categorias = {}
+    for df in data_frames:
+        for coluna in df.columns:
+            if isinstance(df[coluna].dtype, pd.CategoricalDtype):
+                categorias.setdefault(coluna, []).append(df[coluna].cat.categories)
+    tipos = {
+        coluna: pd.CategoricalDtype(indices[0].append(indices[1:]).unique())
+        for coluna, indices in categorias.items()
+    }
+
+    data = pd.concat(
+        [df.astype({coluna: tipo for coluna, tipo in tipos.items() if coluna in df}) for df in data_frames],
+        ignore_index=True,
+    )
+    # Colunas ausentes em algum mês saem do concat como texto
+    return data.astype({coluna: tipo for coluna, tipo in tipos.items() if data[coluna].dtype != tipo})
+
+
+def memoria_mb(data):
+    # Memória ocupada pelo DataFrame, contando o conteúdo dos textos
+    return data.memory_usage(deep=True).sum() / 1024 ** 2
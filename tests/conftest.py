@@ -0,0 +1,23 @@
+import collections
+
+import pytest
+
+from sil_login.sintetico import gerar_exportacoes
+from sil_login.snapshot import atualizar_snapshot
+
+Exportacoes = collections.namedtuple('Exportacoes', 'arquivos padrao snapshot')
+
+
+# Gera exportações sintéticas em uma pasta temporária e, com `converter`, o
+# snapshot delas: exportacoes(linhas=2000, meses=3, converter=True)
+@pytest.fixture
+def exportacoes(tmp_path_factory):
+    def gerar(linhas=2000, meses=3, converter=True):
+        pasta = tmp_path_factory.mktemp('sil')
+        arquivos = gerar_exportacoes(str(pasta / 'csv'), linhas, meses=meses)
+        dados = Exportacoes(arquivos, str(pasta / 'csv' / '*.csv'), str(pasta / 'snapshot'))
+        if converter:
+            assert atualizar_snapshot(dados.padrao, dados.snapshot) == []
+        return dados
+
+    return gerar
@@ -0,0 +1,26 @@
+import os
+
+import pytest
+
+pytest.importorskip('duckdb')
+
+from sil_login.consulta_sql import comparar
+
+
+def test_mesmos_numeros_que_o_cubo(exportacoes):
+    dados = exportacoes(converter=False)
+    combinacoes, diferencas = comparar(dados.padrao, dados.snapshot)
+    assert combinacoes > 0
+    assert diferencas == []
+
+
+def test_mes_que_falhou_na_reconversao(exportacoes):
+    # O mês sai do manifesto, mas o Parquet antigo continua na pasta; o SQL
+    # não pode continuar lendo esse arquivo
+    dados = exportacoes()
+    with open(dados.arquivos[0], 'w', encoding='latin1') as arquivo:
+        arquivo.write('coluna;outra\n1;2\n')
+    os.utime(dados.arquivos[0], (0, 0))
+
+    _, diferencas = comparar(dados.padrao, dados.snapshot)
+    assert diferencas == []
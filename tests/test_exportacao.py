@@ -0,0 +1,104 @@
+import glob
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+
+from sil_login.configuracao import COLUNA_DATA
+from sil_login.exportacao import esquema_comum, exportar, exportar_temporario, linhas_filtradas
+from sil_login.metricas import periodo_do_filtro
+from sil_login.snapshot import ler_snapshot
+
+
+@pytest.fixture
+def snapshot(exportacoes):
+    return exportacoes(3000).snapshot
+
+
+@pytest.mark.parametrize('formato', ['csv', 'parquet'])
+def test_exportar_temporario_aceito_pelo_download_button(snapshot, tmp_path, formato):
+    # O st.download_button chama a função e converte o retorno assim
+    arquivo = exportar_temporario(snapshot, formato, ano=2023)
+    dados, _ = convert_data_to_bytes_and_infer_mime(arquivo, unsupported_error=TypeError(type(arquivo)))
+
+    esperado = tmp_path / f'esperado.{formato}'
+    exportar(snapshot, str(esperado), formato, ano=2023)
+    assert dados == esperado.read_bytes()
+
+    caminho = arquivo.name
+    arquivo.close()
+    assert not os.path.exists(caminho)
+
+
+def test_exportar_temporario_acima_do_limite(snapshot):
+    with pytest.raises(ValueError):
+        exportar_temporario(snapshot, 'csv', maximo_bytes=10)
+
+
+def test_esquema_comum_promove_numericos(tmp_path):
+    meses = [
+        {'valor': pa.array([1.5], pa.float32()), 'n': pa.array([1], pa.int8()), 'placa': pa.array([None], pa.float32())},
+        {'valor': pa.array([2.5], pa.float64()), 'n': pa.array([300], pa.int16()), 'placa': pa.array(['ABC1234'])},
+    ]
+    caminhos = []
+    for i, colunas in enumerate(meses):
+        caminho = str(tmp_path / f'{i}.parquet')
+        pq.write_table(pa.table(colunas), caminho)
+        caminhos.append(caminho)
+
+    esquema = esquema_comum(caminhos)
+    assert esquema.field('valor').type == pa.float64()
+    assert esquema.field('n').type == pa.int16()
+    assert esquema.field('placa').type == pa.string()
+
+
+def test_exportacao_parquet_mantem_valor_numerico(snapshot, tmp_path):
+    destino = str(tmp_path / 'tudo.parquet')
+    exportar(snapshot, destino, 'parquet')
+    assert pa.types.is_floating(pq.read_schema(destino).field('Valor da viagem').type)
+
+
+@pytest.mark.parametrize('filtro', [
+    {}, {'ano': 2023}, {'ano': 2024, 'mes': 2}, {'ano': 2023, 'mes': 12, 'regiao': 'NORDESTE'}, {'ano': 2030},
+])
+@pytest.mark.parametrize('arrow', [True, False])
+def test_linhas_filtradas_pelo_periodo(exportacoes, monkeypatch, filtro, arrow):
+    # A busca binária nas partições ordenadas dá as mesmas linhas que a
+    # máscara de datas sobre o snapshot inteiro, lendo o Arrow ou o Parquet
+    dados = exportacoes(3000, meses=14)
+    if not arrow:
+        for caminho in glob.glob(os.path.join(dados.snapshot, '*', '*', '*.arrow')):
+            os.remove(caminho)
+    todas = ler_snapshot(dados.snapshot)
+    datas = todas[COLUNA_DATA]
+    esperado = datas.notna()
+    periodo = periodo_do_filtro(filtro.get('ano', 'Todos'), filtro.get('mes'))
+    if periodo is not None:
+        esperado &= (datas >= periodo[0]) & (datas < periodo[1])
+    if 'regiao' in filtro:
+        esperado &= todas['Região'] == filtro['regiao']
+
+    lotes = list(linhas_filtradas(dados.snapshot, tamanho_lote=100, **filtro))
+    obtido = pd.concat(lotes)['Número da programação'] if lotes else pd.Series(dtype=object)
+    assert sorted(obtido) == sorted(todas.loc[esperado, 'Número da programação'])
+
+
+def test_csv_no_formato_do_sil(exportacoes, tmp_path):
+    # Exportar um mês devolve o mesmo texto do CSV de origem: identificadores
+    # com células vazias sem ",0" e valores como "100.000,00"
+    dados = exportacoes(1000, meses=2)
+    destino = str(tmp_path / 'mes.csv')
+    exportar(dados.snapshot, destino, 'csv', ano=2023, mes=1)
+
+    def ler(caminho):
+        return pd.read_csv(caminho, sep=';', dtype=str, encoding='latin1', keep_default_na=False)
+
+    origem, exportado = ler(dados.arquivos[0]), ler(destino)
+    colunas = list(origem.columns)
+    assert set(colunas) <= set(exportado.columns)
+    origem = origem.sort_values(colunas, ignore_index=True)
+    exportado = exportado[colunas].sort_values(colunas, ignore_index=True)
+    pd.testing.assert_frame_equal(origem, exportado)
@@ -0,0 +1,96 @@
+import os
+import threading
+
+import pytest
+
+from sil_login.sharepoint_local import criar_servidor
+from sil_login.sincronizacao import SUFIXO_PARCIAL, Biblioteca, ler_manifesto, sincronizar
+
+PREFIXO = '/SIL Log-In'
+
+
+class BibliotecaRegistrando(Biblioteca):
+    # Guarda de que byte começou cada download
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.downloads = []
+
+    def abrir(self, arquivo, inicio=0):
+        self.downloads.append((arquivo['nome'], inicio))
+        return super().abrir(arquivo, inicio)
+
+
+@pytest.fixture
+def biblioteca(tmp_path):
+    # Pasta local servida como a biblioteca do SharePoint, em uma porta livre
+    pasta = tmp_path / 'biblioteca'
+    pasta.mkdir()
+    for mes in (1, 2, 3):
+        (pasta / f'2024-{mes}.csv').write_bytes(f'Mes;Valor\n{mes};'.encode() + os.urandom(5000 * mes))
+    servidor = criar_servidor(str(pasta), PREFIXO, porta=0)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    yield pasta, BibliotecaRegistrando(f'http://127.0.0.1:{servidor.server_address[1]}', PREFIXO)
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def _conteudos(pasta):
+    return {nome: (pasta / nome).read_bytes() for nome in os.listdir(pasta) if nome.endswith('.csv')}
+
+
+def test_download_inicial(biblioteca, tmp_path):
+    pasta, remota = biblioteca
+    cache = tmp_path / 'cache'
+    baixados, erros = sincronizar(remota, str(cache))
+
+    assert erros == []
+    assert baixados == sorted(str(cache / nome) for nome in _conteudos(pasta))
+    assert _conteudos(cache) == _conteudos(pasta)
+    assert sorted(ler_manifesto(str(cache))) == sorted(_conteudos(pasta))
+
+
+def test_arquivos_inalterados_nao_sao_baixados(biblioteca, tmp_path):
+    pasta, remota = biblioteca
+    cache = tmp_path / 'cache'
+    sincronizar(remota, str(cache))
+    remota.downloads.clear()
+
+    (pasta / '2024-2.csv').write_bytes(b'Mes;Valor\n2;alterado\n')
+    baixados, erros = sincronizar(remota, str(cache))
+
+    assert erros == []
+    assert baixados == [str(cache / '2024-2.csv')]
+    assert remota.downloads == [('2024-2.csv', 0)]
+    assert _conteudos(cache) == _conteudos(pasta)
+
+
+def test_download_continua_do_parcial(biblioteca, tmp_path):
+    pasta, remota = biblioteca
+    cache = tmp_path / 'cache'
+    cache.mkdir()
+    arquivo = next(arquivo for arquivo in remota.listar() if arquivo['nome'] == '2024-3.csv')
+
+    # Download interrompido na metade
+    parcial = cache / ('2024-3.csv' + SUFIXO_PARCIAL)
+    parcial.write_bytes((pasta / '2024-3.csv').read_bytes()[:6000])
+    (cache / ('2024-3.csv' + SUFIXO_PARCIAL + '.etag')).write_text(arquivo['etag'], encoding='utf-8')
+
+    baixados, erros = sincronizar(remota, str(cache))
+
+    assert erros == []
+    assert ('2024-3.csv', 6000) in remota.downloads
+    assert _conteudos(cache) == _conteudos(pasta)
+    assert not parcial.exists()
+
+
+def test_arquivo_removido_da_biblioteca(biblioteca, tmp_path):
+    pasta, remota = biblioteca
+    cache = tmp_path / 'cache'
+    sincronizar(remota, str(cache))
+
+    (pasta / '2024-1.csv').unlink()
+    baixados, erros = sincronizar(remota, str(cache))
+
+    assert (baixados, erros) == ([], [])
+    assert not (cache / '2024-1.csv').exists()
+    assert sorted(ler_manifesto(str(cache))) == ['2024-2.csv', '2024-3.csv']
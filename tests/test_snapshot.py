@@ -0,0 +1,31 @@
+import concurrent.futures
+import glob
+import os
+import shutil
+
+from sil_login.snapshot import atualizar_snapshot, ler_manifesto
+
+
+def test_atualizacoes_simultaneas(exportacoes):
+    # Várias sessões do painel atualizando um snapshot vazio ao mesmo tempo
+    dados = exportacoes(meses=6, converter=False)
+    arquivos, padrao, pasta = dados.arquivos, dados.padrao, dados.snapshot
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+        erros = list(executor.map(lambda _: atualizar_snapshot(padrao, pasta), range(4)))
+
+    assert erros == [[]] * 4
+    assert sorted(ler_manifesto(pasta)) == sorted(os.path.basename(arquivo) for arquivo in arquivos)
+    assert glob.glob(os.path.join(pasta, '**', '*.tmp'), recursive=True) == []
+
+
+def test_mes_repetido(exportacoes):
+    # '2023-01.csv' e '2023-1.csv' iriam para a mesma partição
+    dados = exportacoes(meses=2)
+    pasta_csv = os.path.dirname(dados.arquivos[0])
+    shutil.copyfile(os.path.join(pasta_csv, '2023-1.csv'), os.path.join(pasta_csv, '2023-01.csv'))
+
+    erros = atualizar_snapshot(dados.padrao, dados.snapshot)
+
+    assert [os.path.basename(caminho) for caminho, _ in erros] == ['2023-1.csv']
+    assert sorted(ler_manifesto(dados.snapshot)) == ['2023-01.csv', '2023-2.csv']
+    assert len(glob.glob(os.path.join(dados.snapshot, 'ano=*', 'mes=*', 'dados.parquet'))) == 2